@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, literal, select
+from sqlalchemy.orm import Session
+
+import models
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("SERKOR_ARCHIVE_AFTER_DAYS", "365"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("SERKOR_ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVABLE_STATUSES = ("completed", "cancelled")
+
+_VISIT_COLUMNS: List[str] = [column.name for column in models.Visit.__table__.columns]
+_PAYMENT_COLUMNS: List[str] = [column.name for column in models.Payment.__table__.columns]
+
+
+def _copy_rows(db: Session, source, target, columns: List[str], where, archived_at: datetime) -> None:
+    source_table = source.__table__
+    rows = select(*[source_table.c[name] for name in columns], literal(archived_at)).where(where)
+    db.execute(target.__table__.insert().from_select([*columns, "archived_at"], rows))
+
+
+def archive_visits(
+    db: Session,
+    clinic_id: Optional[str] = None,
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+) -> Dict[str, int]:
+    """Move finished visits older than ``older_than_days`` and their payments to the archive.
+
+    Each batch is copied with ``INSERT ... SELECT`` and removed from the hot tables
+    in its own transaction, so writers are only blocked for one batch at a time.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    stmt = select(models.Visit.id).where(
+        models.Visit.status.in_(ARCHIVABLE_STATUSES),
+        models.Visit.start_time < cutoff,
+    )
+    if clinic_id:
+        stmt = stmt.where(models.Visit.clinic_id == clinic_id)
+    stmt = stmt.order_by(models.Visit.start_time.asc()).limit(batch_size)
+
+    visits_moved = 0
+    payments_moved = 0
+    while True:
+        visit_ids = db.execute(stmt).scalars().all()
+        if not visit_ids:
+            break
+
+        archived_at = datetime.utcnow()
+        _copy_rows(
+            db,
+            models.Visit,
+            models.ArchivedVisit,
+            _VISIT_COLUMNS,
+            models.Visit.id.in_(visit_ids),
+            archived_at,
+        )
+        _copy_rows(
+            db,
+            models.Payment,
+            models.ArchivedPayment,
+            _PAYMENT_COLUMNS,
+            models.Payment.visit_id.in_(visit_ids),
+            archived_at,
+        )
+        payments_moved += db.execute(
+            delete(models.Payment)
+            .where(models.Payment.visit_id.in_(visit_ids))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        visits_moved += db.execute(
+            delete(models.Visit)
+            .where(models.Visit.id.in_(visit_ids))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+
+    return {"visits": visits_moved, "payments": payments_moved}
+
+
+def delete_patient_archive(db: Session, patient_id: str) -> None:
+    """Remove a patient's archived visits and payments; the archive has no cascading foreign keys."""
+    visit_ids = select(models.ArchivedVisit.id).where(models.ArchivedVisit.patient_id == patient_id)
+    db.execute(
+        delete(models.ArchivedPayment)
+        .where(models.ArchivedPayment.visit_id.in_(visit_ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        delete(models.ArchivedVisit)
+        .where(models.ArchivedVisit.patient_id == patient_id)
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import Header
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.orm import Session
+
+from database import SHARD_DIR, session_scope
+import models
+import schemas
+
+AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("SERKOR_AUDIT_FLUSH_INTERVAL_SECONDS", "2"))
+AUDIT_BATCH_SIZE = int(os.getenv("SERKOR_AUDIT_BATCH_SIZE", "500"))
+AUDIT_QUEUE_LIMIT = int(os.getenv("SERKOR_AUDIT_QUEUE_LIMIT", "100000"))
+
+AUDITED_MODELS = (
+    models.Clinic,
+    models.User,
+    models.Doctor,
+    models.Service,
+    models.Patient,
+    models.Visit,
+    models.Payment,
+    models.PatientFile,
+)
+_REDACTED_FIELDS = frozenset({"password"})
+_PENDING_KEY = "audit_pending"
+
+logger = logging.getLogger("serkor.audit")
+current_user: ContextVar[Optional[str]] = ContextVar("audit_user", default=None)
+
+
+async def bind_user(x_user_id: Optional[str] = Header(None)) -> None:
+    """App-wide dependency: remember who is making the request for the audit trail."""
+    current_user.set(x_user_id)
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _value(key: str, value: Any) -> Any:
+    return "***" if key in _REDACTED_FIELDS and value is not None else _jsonable(value)
+
+
+def _clinic_id(entity: Any) -> Optional[str]:
+    if isinstance(entity, models.Clinic):
+        return entity.id
+    if isinstance(entity, models.Payment):
+        visit = entity.__dict__.get("visit")
+        return visit.clinic_id if visit is not None else None
+    return getattr(entity, "clinic_id", None)
+
+
+def record(
+    session: Session,
+    entity: str,
+    entity_id: str,
+    clinic_id: Optional[str],
+    action: str,
+    changes: Dict[str, Any],
+) -> None:
+    """Stage an audit entry; it is queued when ``session`` commits and dropped on rollback."""
+    session.info.setdefault(_PENDING_KEY, []).append(
+        {
+            "id": schemas.create_id("audit"),
+            "clinic_id": clinic_id,
+            "entity": entity,
+            "entity_id": entity_id,
+            "action": action,
+            "changes": changes,
+            "user_id": current_user.get(),
+            "created_at": datetime.utcnow(),
+        }
+    )
+
+
+def diff(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: {"before": _value(key, before.get(key)), "after": _value(key, value)}
+        for key, value in after.items()
+        if before.get(key) != value
+    }
+
+
+def _entity_changes(entity: Any, action: str) -> Dict[str, Any]:
+    state = inspect(entity)
+    changes: Dict[str, Any] = {}
+    for attr in state.mapper.column_attrs:
+        key = attr.key
+        if action == "create":
+            changes[key] = {"before": None, "after": _value(key, state.dict.get(key))}
+        elif action == "delete":
+            changes[key] = {"before": _value(key, state.dict.get(key)), "after": None}
+        else:
+            history = state.attrs[key].history
+            if history.added or history.deleted:
+                before = history.deleted[0] if history.deleted else None
+                after = history.added[0] if history.added else None
+                if before != after:
+                    changes[key] = {"before": _value(key, before), "after": _value(key, after)}
+    return changes
+
+
+@event.listens_for(Session, "after_flush")
+def _stage_flushed_changes(session: Session, _flush_context) -> None:
+    for action, entities in (("create", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for entity in entities:
+            if not isinstance(entity, AUDITED_MODELS):
+                continue
+            changes = _entity_changes(entity, action)
+            if action == "update" and not changes:
+                continue
+            record(session, entity.__tablename__, entity.id, _clinic_id(entity), action, changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _queue_committed_changes(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        writer.enqueue(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_changes(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+class AuditWriter:
+    """In-memory queue of audit rows, written to the database in batches off the request path."""
+
+    def __init__(self, limit: int) -> None:
+        self._queue: deque = deque(maxlen=limit)
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, rows: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            if len(self._queue) + len(rows) > (self._queue.maxlen or 0):
+                logger.warning("Audit queue is full, dropping the oldest entries")
+            self._queue.extend(rows)
+            full = len(self._queue) >= AUDIT_BATCH_SIZE
+        if full and self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def flush(self) -> int:
+        """Write everything queued so far; rows that fail to write are put back."""
+        with self._lock:
+            rows = list(self._queue)
+            self._queue.clear()
+        if not rows:
+            return 0
+
+        by_clinic: Dict[Optional[str], List[Dict[str, Any]]] = defaultdict(list)
+        for row in rows:
+            by_clinic[row["clinic_id"]].append(row)
+        written = 0
+        for clinic_id, clinic_rows in by_clinic.items():
+            if clinic_id is None and SHARD_DIR:
+                logger.warning("Dropping %d audit entries without a clinic in sharded mode", len(clinic_rows))
+                continue
+            try:
+                with session_scope(clinic_id) as session:
+                    for start in range(0, len(clinic_rows), AUDIT_BATCH_SIZE):
+                        session.execute(insert(models.AuditLog), clinic_rows[start : start + AUDIT_BATCH_SIZE])
+                written += len(clinic_rows)
+            except Exception:
+                logger.exception("Failed to write %d audit entries, will retry", len(clinic_rows))
+                with self._lock:
+                    self._queue.extendleft(reversed(clinic_rows))
+        return written
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), AUDIT_FLUSH_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                await asyncio.to_thread(self.flush)
+        finally:
+            self._loop = None
+            self._wakeup = None
+
+
+writer = AuditWriter(AUDIT_QUEUE_LIMIT)
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import glob
+import gzip
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from database import SHARD_DIR, engine
+
+BACKUP_DIR = os.path.abspath(
+    os.getenv("SERKOR_BACKUP_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "backups")
+)
+BACKUP_KEEP = int(os.getenv("SERKOR_BACKUP_KEEP", "14"))
+BACKUP_INTERVAL_MINUTES = float(os.getenv("SERKOR_BACKUP_INTERVAL_MINUTES", "0"))
+BACKUP_PAGES_PER_STEP = int(os.getenv("SERKOR_BACKUP_PAGES_PER_STEP", "256"))
+BACKUP_STEP_SLEEP = 0.01
+
+_backup_lock = threading.Lock()
+
+
+class BackupError(Exception):
+    pass
+
+
+def database_files() -> Dict[str, str]:
+    """Map of backup name to SQLite file for the main database and, in sharded mode, every shard."""
+    if engine.url.get_backend_name() != "sqlite" or not engine.url.database:
+        raise BackupError("Online backups are only supported for file-based SQLite databases")
+    files = {"main": engine.url.database}
+    if SHARD_DIR:
+        for path in sorted(glob.glob(os.path.join(SHARD_DIR, "*.db"))):
+            files[f"shard-{os.path.splitext(os.path.basename(path))[0]}"] = path
+    return files
+
+
+def _snapshots(name: str) -> List[str]:
+    # Timestamps in the file name sort chronologically
+    return sorted(glob.glob(os.path.join(BACKUP_DIR, f"{name}-*.db.gz")))
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _online_copy(source_path: str, target_path: str) -> None:
+    # The backup API copies a few pages at a time and releases the read lock
+    # in between, so writers keep going while the snapshot is taken.
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP)
+    finally:
+        target.close()
+        source.close()
+
+
+def verify_backup(path: str) -> Dict[str, object]:
+    """Restore a snapshot into a temporary database and check that it is usable."""
+    with tempfile.TemporaryDirectory() as workdir:
+        restored = os.path.join(workdir, "restore.db")
+        with gzip.open(path, "rb") as compressed, open(restored, "wb") as target:
+            shutil.copyfileobj(compressed, target)
+        conn = sqlite3.connect(restored)
+        try:
+            integrity = conn.execute("PRAGMA integrity_check").fetchone()[0]
+            tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+            rows = {table: conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in tables}
+        finally:
+            conn.close()
+    if integrity != "ok":
+        raise BackupError(f"Backup {os.path.basename(path)} failed integrity check: {integrity}")
+    return {"file": os.path.basename(path), "integrity": integrity, "rows": rows}
+
+
+def _apply_retention(name: str) -> List[str]:
+    removed = []
+    for path in _snapshots(name)[:-BACKUP_KEEP] if BACKUP_KEEP > 0 else []:
+        os.remove(path)
+        removed.append(os.path.basename(path))
+    return removed
+
+
+def snapshot(name: str, source_path: str) -> Dict[str, object]:
+    """Take one compressed snapshot of ``source_path``; unchanged databases are skipped."""
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    raw = os.path.join(BACKUP_DIR, f".{name}.tmp")
+    try:
+        _online_copy(source_path, raw)
+        digest = _sha256(raw)[:12]
+        previous = _snapshots(name)
+        if previous and previous[-1].endswith(f"-{digest}.db.gz"):
+            return {"name": name, "file": os.path.basename(previous[-1]), "skipped": True}
+
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        target = os.path.join(BACKUP_DIR, f"{name}-{stamp}-{digest}.db.gz")
+        with open(raw, "rb") as source, gzip.open(target, "wb", compresslevel=6) as compressed:
+            shutil.copyfileobj(source, compressed)
+    finally:
+        if os.path.exists(raw):
+            os.remove(raw)
+
+    try:
+        verification = verify_backup(target)
+    except Exception:
+        os.remove(target)
+        raise
+    return {
+        "name": name,
+        "file": os.path.basename(target),
+        "skipped": False,
+        "size": os.path.getsize(target),
+        "rows": verification["rows"],
+        "removed": _apply_retention(name),
+    }
+
+
+def run_backup() -> List[Dict[str, object]]:
+    """Snapshot every database file. Concurrent calls wait for the running backup."""
+    with _backup_lock:
+        return [snapshot(name, path) for name, path in database_files().items()]
+
+
+def list_backups() -> List[Dict[str, object]]:
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    return [
+        {
+            "file": os.path.basename(path),
+            "size": os.path.getsize(path),
+            "createdAt": datetime.utcfromtimestamp(os.path.getmtime(path)).isoformat(),
+        }
+        for path in sorted(glob.glob(os.path.join(BACKUP_DIR, "*.db.gz")), reverse=True)
+    ]
+
+
+def backup_path(file_name: str) -> str:
+    path = os.path.join(BACKUP_DIR, os.path.basename(file_name))
+    if not path.endswith(".db.gz") or not os.path.isfile(path):
+        raise FileNotFoundError(file_name)
+    return path
+
+
+class BackupScheduler:
+    """Background thread that runs :func:`run_backup` every ``interval_minutes``."""
+
+    def __init__(self, interval_minutes: float) -> None:
+        self.interval = interval_minutes * 60
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="serkor-backup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                run_backup()
+                self.last_error = None
+            except Exception as exc:  # keep the schedule alive; surfaced via the admin endpoint
+                self.last_error = str(exc)
+
+
+scheduler = BackupScheduler(BACKUP_INTERVAL_MINUTES)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark primary key schemes on a SQLite table shaped like ``visits``.
+
+Compares the old random ids (``prefix_`` + 12 hex chars of uuid4) with the
+time-ordered ids from ``schemas.create_id``: insert throughput, and table plus
+index size on disk after the load.
+
+Usage:
+    python3 bench_ids.py [rows]      # defaults to 200000 rows
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from uuid import uuid4
+
+from schemas import create_id
+
+BATCH_SIZE = 1000
+
+
+def random_id(prefix: str) -> str:
+    return f"{prefix}_{uuid4().hex[:12]}"
+
+
+def run(label: str, make_id, rows: int, workdir: str) -> None:
+    path = os.path.join(workdir, f"{label}.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE visits (id VARCHAR(64) PRIMARY KEY, clinic_id VARCHAR(64), start_time DATETIME, notes TEXT)"
+    )
+    conn.execute("CREATE INDEX ix_visits_clinic_start ON visits (clinic_id, start_time)")
+    conn.commit()
+
+    started = time.perf_counter()
+    now = datetime.utcnow().isoformat()
+    for offset in range(0, rows, BATCH_SIZE):
+        conn.executemany(
+            "INSERT INTO visits VALUES (?, ?, ?, ?)",
+            [(make_id("visit"), "clinic_bench", now, "") for _ in range(min(BATCH_SIZE, rows - offset))],
+        )
+        conn.commit()
+    elapsed = time.perf_counter() - started
+
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    conn.close()
+    print(
+        f"{label:<12} {rows / elapsed:>12,.0f} rows/s {elapsed:>8.2f} s"
+        f" {(pages - free_pages) * page_size / 1024 / 1024:>10.1f} MiB"
+    )
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print(f"Inserting {rows:,} rows in batches of {BATCH_SIZE}")
+    print(f"{'scheme':<12} {'throughput':>19} {'time':>10} {'size':>14}")
+    with tempfile.TemporaryDirectory() as workdir:
+        run("random", random_id, rows, workdir)
+        run("time-ordered", create_id, rows, workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression check for the API.
+
+Seeds a temporary database with a realistic clinic, calls every endpoint listed in
+ENDPOINTS, captures each SQL statement it issues and runs EXPLAIN QUERY PLAN on it.
+Exits with status 1 if a statement scans one of the large tables without an index,
+if an endpoint issues more statements than its budget, or if an /api route is
+neither in ENDPOINTS nor in EXCLUDED.
+
+Usage:
+    python3 check_query_plans.py [-v]
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+_workdir = tempfile.mkdtemp(prefix="serkor-plans-")
+os.environ["SERKOR_DB_PATH"] = os.path.join(_workdir, "plans.db")
+os.environ.pop("SERKOR_DB_URL", None)
+os.environ.pop("SERKOR_SHARD_DIR", None)
+os.environ["SERKOR_MAX_CONCURRENT_REQUESTS"] = "0"
+os.environ["SERKOR_BACKUP_DIR"] = os.path.join(_workdir, "backups")
+os.environ["SERKOR_PROFILE_DIR"] = os.path.join(_workdir, "profiles")
+os.environ["SERKOR_ADMIN_TOKEN"] = "plans"
+
+from fastapi.routing import APIRoute  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+
+from database import engine  # noqa: E402
+from duplicates import normalize_phone  # noqa: E402
+import audit  # noqa: E402
+import main  # noqa: E402
+import models  # noqa: E402
+import offboarding  # noqa: E402
+
+# Tables that grow with clinic activity; a full scan of any of them is a regression.
+LARGE_TABLES = {
+    "patients",
+    "visits",
+    "payments",
+    "patient_files",
+    "audit_logs",
+    "archived_visits",
+    "archived_payments",
+}
+
+CLINIC = "clinic_plans"
+OTHER_CLINIC = "clinic_other"
+PATIENT = "patient_00001"
+DOCTOR = "doctor_000"
+VISIT = "visit_000000"
+SERIES = "series_plans"
+FILE = "file_00001"
+
+PATIENTS = 3000
+VISITS = 20000
+DOCTORS = 8
+FILES = 6000
+
+
+def seed() -> None:
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(
+            insert(models.Clinic),
+            [{"id": CLINIC, "name": "Plans"}, {"id": OTHER_CLINIC, "name": "Other"}],
+        )
+        conn.execute(
+            insert(models.User),
+            [{"id": "user_admin", "email": "admin@plans.test", "clinic_id": CLINIC, "role": "admin"}],
+        )
+        conn.execute(
+            insert(models.Doctor),
+            [
+                {"id": f"doctor_{i:03d}", "name": f"Doctor {i}", "color": "blue", "clinic_id": CLINIC}
+                for i in range(DOCTORS)
+            ],
+        )
+        conn.execute(
+            insert(models.Service),
+            [{"id": f"service_{i:03d}", "name": f"Service {i}", "clinic_id": CLINIC} for i in range(30)],
+        )
+        conn.execute(
+            insert(models.Patient),
+            [
+                {
+                    "id": f"patient_{i:05d}",
+                    "name": f"Patient {i}",
+                    "phone": f"+99290{i:07d}",
+                    "phone_normalized": normalize_phone(f"+99290{i:07d}"),
+                    "email": "",
+                    "date_of_birth": now - timedelta(days=rng.randint(3000, 30000)),
+                    "clinic_id": CLINIC if i % 10 else OTHER_CLINIC,
+                    "teeth": [{"toothNumber": 11 + n, "status": "healthy"} for n in range(8)],
+                    "services": [],
+                    "created_at": now - timedelta(days=rng.randint(0, 2000)),
+                    "updated_at": now,
+                }
+                for i in range(PATIENTS)
+            ],
+        )
+        visits = []
+        payments = []
+        for i in range(VISITS):
+            start = now + timedelta(days=rng.randint(-1500, 60), hours=rng.randint(8, 18))
+            # The first few visits are used as fixtures and must belong to CLINIC
+            patient = 1 if i < 10 else rng.randrange(PATIENTS)
+            visits.append(
+                {
+                    "id": f"visit_{i:06d}",
+                    "patient_id": f"patient_{patient:05d}",
+                    "doctor_id": f"doctor_{rng.randrange(DOCTORS):03d}",
+                    "clinic_id": CLINIC if patient % 10 else OTHER_CLINIC,
+                    "start_time": start,
+                    "end_time": start + timedelta(minutes=30),
+                    "services": [{"serviceId": "service_001", "quantity": 1}],
+                    "status": "completed" if start < now else "scheduled",
+                    "treated_teeth": [],
+                    "created_at": start,
+                    "updated_at": start,
+                }
+            )
+            if start < now:
+                payments.append(
+                    {"id": f"payment_{i:06d}", "visit_id": f"visit_{i:06d}", "amount": 100, "method": "cash", "date": start}
+                )
+        conn.execute(insert(models.Visit), visits)
+        series_start = datetime(2031, 1, 6, 9)
+        series_visits = [
+            {
+                "id": f"visit_series_{n:02d}",
+                "patient_id": PATIENT,
+                "doctor_id": DOCTOR,
+                "clinic_id": CLINIC,
+                "start_time": series_start + timedelta(weeks=n),
+                "end_time": series_start + timedelta(weeks=n, minutes=30),
+                "services": [],
+                "status": "scheduled",
+                "treated_teeth": [],
+                "series_id": SERIES,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for n in range(12)
+        ]
+        conn.execute(insert(models.Visit), series_visits)
+        conn.execute(insert(models.Payment), payments)
+        conn.execute(
+            insert(models.PatientFile),
+            [
+                {
+                    "id": f"file_{i:05d}",
+                    "patient_id": f"patient_{i % PATIENTS:05d}",
+                    "clinic_id": CLINIC if i % PATIENTS % 10 else OTHER_CLINIC,
+                    "name": f"scan-{i}.png",
+                    "file_url": f"/files/scan-{i}.png",
+                    "uploaded_at": now - timedelta(days=rng.randint(0, 2000)),
+                }
+                for i in range(FILES)
+            ],
+        )
+        conn.execute(
+            insert(models.ArchivedVisit),
+            [
+                {**visit, "id": f"visit_archived_{n:06d}", "archived_at": now}
+                for n, visit in enumerate(visits[:5000])
+            ],
+        )
+        conn.execute(
+            insert(models.ArchivedPayment),
+            [
+                {**payment, "id": f"payment_archived_{n:06d}", "visit_id": f"visit_archived_{n:06d}", "archived_at": now}
+                for n, payment in enumerate(payments[:4000])
+            ],
+        )
+        conn.exec_driver_sql("ANALYZE")
+
+
+def _visit_body(**overrides: Any) -> Dict[str, Any]:
+    body = {
+        "patientId": PATIENT,
+        "doctorId": DOCTOR,
+        "clinicId": CLINIC,
+        "startTime": "2030-01-01T10:00:00",
+        "endTime": "2030-01-01T10:30:00",
+        "status": "scheduled",
+    }
+    body.update(overrides)
+    return body
+
+
+# name, method, path, query, JSON body, statement budget
+ENDPOINTS: List[Tuple[str, str, str, Dict[str, Any], Optional[Dict[str, Any]], int]] = [
+    ("list clinics", "GET", "/api/clinics", {}, None, 1),
+    ("clinic by id", "GET", "/api/clinics", {"id": CLINIC}, None, 1),
+    ("list users by clinic", "GET", "/api/users", {"clinicId": CLINIC}, None, 1),
+    ("user by email", "GET", "/api/users", {"email": "admin@plans.test"}, None, 1),
+    ("list doctors", "GET", "/api/doctors", {"clinicId": CLINIC}, None, 1),
+    ("list services", "GET", "/api/services", {"clinicId": CLINIC}, None, 1),
+    ("list patients", "GET", "/api/patients", {"clinicId": CLINIC}, None, 1),
+    ("list patients compact", "GET", "/api/patients", {"clinicId": CLINIC, "view": "compact"}, None, 1),
+    ("patients by phone", "GET", "/api/patients", {"clinicId": CLINIC, "phone": "+992 90 000 00 01"}, None, 1),
+    ("duplicate patients", "GET", "/api/patients/duplicates", {"clinicId": CLINIC}, None, 1),
+    ("list visits", "GET", "/api/visits", {"clinicId": CLINIC}, None, 1),
+    ("list visits calendar", "GET", "/api/visits", {"clinicId": CLINIC, "view": "calendar"}, None, 1),
+    ("list visits with archive", "GET", "/api/visits", {"clinicId": CLINIC, "includeArchived": "true"}, None, 2),
+    ("list payments", "GET", "/api/payments", {"visitId": VISIT, "includeArchived": "true"}, None, 2),
+    ("list files by patient", "GET", "/api/files", {"patientId": PATIENT}, None, 1),
+    ("list files by clinic", "GET", "/api/files", {"clinicId": CLINIC}, None, 1),
+    ("audit by entity", "GET", "/api/audit", {"clinicId": CLINIC, "entity": "visits", "entityId": VISIT}, None, 1),
+    ("create clinic", "POST", "/api/clinics", {}, {"name": "New clinic"}, 2),
+    ("create user", "POST", "/api/users", {}, {"email": "new@plans.test", "clinicId": CLINIC}, 4),
+    ("create doctor", "POST", "/api/doctors", {}, {"name": "New", "clinicId": CLINIC, "userId": "user_admin"}, 5),
+    ("create service", "POST", "/api/services", {}, {"name": "New", "defaultPrice": 10, "clinicId": CLINIC}, 3),
+    ("create patient", "POST", "/api/patients", {}, {"name": "New", "phone": "1", "clinicId": CLINIC}, 4),
+    (
+        "create file",
+        "POST",
+        "/api/files",
+        {},
+        {"patientId": PATIENT, "clinicId": CLINIC, "name": "x-ray.png", "file": "/files/x-ray.png"},
+        4,
+    ),
+    ("patch patient", "PATCH", f"/api/patients/{PATIENT}", {"clinicId": CLINIC}, {"teeth": {"11": "filled"}}, 2),
+    ("create visit", "POST", "/api/visits", {}, _visit_body(), 6),
+    ("update visit", "POST", "/api/visits", {}, _visit_body(id=VISIT), 6),
+    ("patch visit", "PATCH", f"/api/visits/{VISIT}", {"clinicId": CLINIC}, {"notes": "checked"}, 2),
+    (
+        "create visit series",
+        "POST",
+        "/api/visits/series",
+        {},
+        {
+            **_visit_body(startTime="2032-01-05T10:00:00", endTime="2032-01-05T10:30:00"),
+            "recurrence": {"frequency": "weekly", "count": 20},
+        },
+        5,
+    ),
+    (
+        "shift rest of series",
+        "PATCH",
+        f"/api/visits/series/{SERIES}",
+        {"clinicId": CLINIC},
+        {"fromTime": "2031-02-01T00:00:00", "shiftMinutes": 60},
+        4,
+    ),
+    ("add payment", "POST", "/api/payments", {}, {"visitId": VISIT, "amount": 50, "method": "cash"}, 6),
+    (
+        "batch",
+        "POST",
+        "/api/batch",
+        {},
+        {
+            "clinicId": CLINIC,
+            "operations": [
+                {"op": "upsert", "resource": "visits", "data": _visit_body(id=VISIT, status="completed")},
+                {"op": "upsert", "resource": "payments", "data": {"visitId": VISIT, "amount": 10, "method": "cash"}},
+            ],
+        },
+        10,
+    ),
+    (
+        "merge patients",
+        "POST",
+        "/api/patients/merge",
+        {},
+        {"clinicId": CLINIC, "targetId": "patient_00002", "sourceIds": ["patient_00003"]},
+        6,
+    ),
+    ("delete visit", "DELETE", "/api/visits", {"id": "visit_000002", "clinicId": CLINIC}, None, 5),
+    ("delete payment", "DELETE", "/api/payments/payment_000003", {}, None, 5),
+    ("delete file", "DELETE", "/api/files", {"id": FILE, "clinicId": CLINIC}, None, 2),
+    ("delete service", "DELETE", "/api/services", {"id": "service_002", "clinicId": CLINIC}, None, 2),
+    ("delete doctor", "DELETE", "/api/doctors", {"id": "doctor_007", "clinicId": CLINIC}, None, 4),
+    ("delete patient", "DELETE", "/api/patients", {"id": "patient_00004", "clinicId": CLINIC}, None, 10),
+    # The admin endpoints below change a lot of data, so they run last
+    ("archive", "POST", "/api/admin/archive", {"olderThanDays": 1400, "batchSize": 5000}, None, 6),
+    (
+        "offboard doctor",
+        "POST",
+        "/api/admin/offboarding/doctors",
+        {},
+        {"clinicId": CLINIC, "doctorId": "doctor_006", "reassignTo": "doctor_005"},
+        20,
+    ),
+    # Offboarding jobs issue a few statements per batch, so these budgets follow the seeded row counts
+    ("purge clinic", "POST", "/api/admin/offboarding/clinics", {}, {"clinicId": OTHER_CLINIC}, 50),
+    ("list offboarding jobs", "GET", "/api/admin/offboarding/jobs", {}, None, 0),
+    ("list backups", "GET", "/api/admin/backups", {}, None, 0),
+    ("list profiles", "GET", "/api/admin/profiles", {}, None, 0),
+]
+
+# method, route path: why the route is not in ENDPOINTS
+EXCLUDED: Dict[Tuple[str, str], str] = {
+    ("GET", "/api/admin/offboarding/jobs/{job_id}"): "in-memory lookup like the job list, no SQL",
+    ("POST", "/api/admin/backups"): "copies database pages through the SQLite backup API",
+    ("POST", "/api/admin/backups/verify"): "reads a backup file, not the live database",
+    ("GET", "/api/admin/profiles/{file}"): "serves a file from the profile directory",
+}
+
+
+class StatementRecorder:
+    def __init__(self) -> None:
+        self.active = False
+        self.statements: List[Tuple[str, Any]] = []
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, _conn, _cursor, statement, parameters, _context, executemany) -> None:
+        # An executemany is one statement sent with several parameter sets; its plan is
+        # the same for all of them, so the first set is enough for EXPLAIN.
+        if self.active:
+            self.statements.append((statement, parameters[0] if executemany else parameters))
+
+    def start(self) -> None:
+        self.statements = []
+        self.active = True
+
+    def stop(self) -> List[Tuple[str, Any]]:
+        self.active = False
+        return self.statements
+
+
+async def call(method: str, path: str, query: Dict[str, Any], body: Optional[Dict[str, Any]]) -> Tuple[int, bytes]:
+    """Send one request straight to the ASGI app."""
+    raw_body = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": urlencode(query).encode(),
+        "headers": [
+            (b"host", b"plans"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(raw_body)).encode()),
+            (b"x-admin-token", os.environ["SERKOR_ADMIN_TOKEN"].encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("plans", 80),
+    }
+    requests = [{"type": "http.request", "body": raw_body, "more_body": False}]
+    finished = asyncio.Event()
+    response: Dict[str, Any] = {"status": 0, "body": b""}
+
+    async def receive():
+        if requests:
+            return requests.pop(0)
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+            if not message.get("more_body"):
+                finished.set()
+
+    await main.app(scope, receive, send)
+    return response["status"], response["body"]
+
+
+def explain(statement: str, parameters: Any) -> List[str]:
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    scans = []
+    for detail in plan:
+        words = detail.split()
+        if len(words) >= 2 and words[0] == "SCAN" and words[1] in LARGE_TABLES and "COVERING INDEX" not in detail:
+            scans.append(detail)
+    return scans
+
+
+def uncovered_routes() -> List[str]:
+    missing = []
+    for route in main.app.routes:
+        if not isinstance(route, APIRoute) or not route.path.startswith("/api"):
+            continue
+        for method in sorted(route.methods):
+            if (method, route.path) in EXCLUDED:
+                continue
+            if not any(verb == method and route.path_regex.match(path) for _n, verb, path, *_rest in ENDPOINTS):
+                missing.append(f"{method} {route.path}")
+    return missing
+
+
+def wait_for_jobs() -> None:
+    """Offboarding runs in a background job; its statements count towards the endpoint that started it."""
+    while any(job.active for job in offboarding.runner.list()):
+        time.sleep(0.01)
+
+
+def check(verbose: bool = False) -> int:
+    seed()
+    recorder = StatementRecorder()
+    failures = 0
+    for name, method, path, query, body, budget in ENDPOINTS:
+        # Audit entries of earlier endpoints would otherwise be written during this one
+        audit.writer.flush()
+        recorder.start()
+        status, content = asyncio.run(call(method, path, query, body))
+        wait_for_jobs()
+        statements = recorder.stop()
+
+        problems = []
+        if status >= 400:
+            problems.append(f"returned {status}: {content[:200]!r}")
+        if len(statements) > budget:
+            problems.append(f"issued {len(statements)} statements, budget is {budget}")
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+                continue
+            plan = explain(statement, parameters)
+            for scan in full_scans(plan):
+                problems.append(f"full scan ({scan}) in: {' '.join(statement.split())[:160]}")
+            if verbose:
+                print(f"    {' '.join(statement.split())[:120]}")
+                for detail in plan:
+                    print(f"        {detail}")
+
+        if problems:
+            failures += 1
+            print(f"✗ {name} ({method} {path})")
+            for problem in problems:
+                print(f"    {problem}")
+        else:
+            print(f"✓ {name} ({len(statements)}/{budget} statements)")
+
+    print(f"{len(ENDPOINTS) - failures}/{len(ENDPOINTS)} endpoints passed")
+    for route in uncovered_routes():
+        failures += 1
+        print(f"✗ {route} is neither in ENDPOINTS nor in EXCLUDED")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if check(verbose="-v" in sys.argv[1:]) else 0)
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+MAX_CONCURRENT_REQUESTS = int(os.getenv("SERKOR_MAX_CONCURRENT_REQUESTS", "32"))
+MAX_QUEUED_REQUESTS = int(os.getenv("SERKOR_MAX_QUEUED_REQUESTS", "64"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("SERKOR_QUEUE_TIMEOUT_SECONDS", "5"))
+RETRY_AFTER_SECONDS = int(os.getenv("SERKOR_RETRY_AFTER_SECONDS", "2"))
+
+# Headers that change what a GET returns, so they are part of the coalescing key
+_KEY_HEADERS = ("x-clinic-id", "x-admin-token", "authorization")
+_UNGATED_PATHS = frozenset({"/health"})
+
+
+class Overloaded(Exception):
+    pass
+
+
+class AdmissionController:
+    """Caps requests running at once; extra ones wait in a bounded queue for a limited time."""
+
+    def __init__(self, max_concurrent: int, max_queued: int, timeout: float) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max(max_concurrent, 1))
+        self._waiting = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.max_concurrent <= 0:
+            yield
+            return
+        if self._semaphore.locked() and self._waiting >= self.max_queued:
+            raise Overloaded()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise Overloaded()
+        finally:
+            self._waiting -= 1
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers with the same key share its result."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        pending = self._calls.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting when the leader fails; mark the exception as retrieved
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+
+def _coalescing_key(request: Request) -> Tuple:
+    headers = tuple(request.headers.get(name) for name in _KEY_HEADERS)
+    return (request.url.path, tuple(sorted(request.query_params.multi_items())), headers)
+
+
+def _can_coalesce(request: Request) -> bool:
+    # Streamed responses are meant to stay out of memory, so they are never buffered for sharing;
+    # a profiled request has to run on its own to measure anything
+    return request.method == "GET" and "stream" not in request.query_params and "x-profile" not in request.headers
+
+
+class RequestGateMiddleware(BaseHTTPMiddleware):
+    """Coalesces identical concurrent GETs and sheds load with a fast 503 when saturated."""
+
+    def __init__(self, app) -> None:
+        super().__init__(app)
+        self.admission = AdmissionController(MAX_CONCURRENT_REQUESTS, MAX_QUEUED_REQUESTS, QUEUE_TIMEOUT_SECONDS)
+        self.single_flight = SingleFlight()
+
+    async def dispatch(self, request: Request, call_next):
+        if request.url.path in _UNGATED_PATHS:
+            return await call_next(request)
+
+        async def run() -> Response:
+            # The slot is held until the body is sent: a streamed response only starts
+            # its queries once call_next has returned.
+            slot = AsyncExitStack()
+            await slot.enter_async_context(self.admission.slot())
+            try:
+                response = await call_next(request)
+            except BaseException:
+                await slot.aclose()
+                raise
+            body = response.body_iterator
+
+            async def release_after_body():
+                try:
+                    async for chunk in body:
+                        yield chunk
+                finally:
+                    await slot.aclose()
+
+            response.body_iterator = release_after_body()
+            return response
+
+        async def run_buffered() -> Tuple[int, list, bytes]:
+            response = await run()
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            return response.status_code, response.raw_headers, body
+
+        try:
+            if not _can_coalesce(request):
+                return await run()
+            status_code, raw_headers, body = await self.single_flight.do(_coalescing_key(request), run_buffered)
+        except Overloaded:
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "Server is busy, please retry shortly"},
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+
+        response = Response(content=body, status_code=status_code)
+        response.raw_headers = list(raw_headers)
+        return response
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
 import os
+import threading
+from collections import OrderedDict
 from contextlib import contextmanager
-from typing import Iterator
+from typing import Iterator, Optional
 
-from sqlalchemy import create_engine
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
 
@@ -26,16 +30,177 @@ def _build_database_url() -> str:
     return f"sqlite:///{path}"
 
 
+def _build_shard_dir() -> Optional[str]:
+    path = os.getenv("SERKOR_SHARD_DIR")
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
 DATABASE_URL = _build_database_url()
 connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
 
 engine = create_engine(DATABASE_URL, future=True, connect_args=connect_args)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+if DATABASE_URL.startswith("sqlite"):
+
+    @event.listens_for(engine, "connect")
+    def _enable_foreign_keys(dbapi_connection, _connection_record) -> None:
+        # SQLite ignores REFERENCES/ON DELETE unless asked per connection. Shard engines are
+        # left alone: their tables point at clinics and users, which live in the catalog.
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
 Base = declarative_base()
 
+# Sharded mode -----------------------------------------------------------------
+# When SERKOR_SHARD_DIR is set, every clinic gets its own SQLite file in that
+# directory. The main database becomes a small catalog holding only clinics and
+# users; all other tables live in the clinic's shard.
+
+SHARD_DIR = _build_shard_dir()
+SHARD_CACHE_SIZE = int(os.getenv("SERKOR_SHARD_CACHE_SIZE", "32"))
+CATALOG_TABLES = frozenset({"clinics", "users"})
+
+
+def shard_path(clinic_id: str) -> str:
+    if not SHARD_DIR:
+        raise RuntimeError("Sharded mode is disabled (SERKOR_SHARD_DIR is not set)")
+    safe_id = "".join(ch for ch in clinic_id if ch.isalnum() or ch in "-_")
+    if not safe_id:
+        raise ValueError(f"Invalid clinic id: {clinic_id!r}")
+    return os.path.join(SHARD_DIR, f"{safe_id}.db")
+
+
+def catalog_tables():
+    return [table for name, table in Base.metadata.tables.items() if name in CATALOG_TABLES]
+
+
+def shard_tables():
+    return [table for name, table in Base.metadata.tables.items() if name not in CATALOG_TABLES]
+
+
+class UnknownClinic(Exception):
+    def __str__(self) -> str:
+        return "Clinic not found"
+
+
+def _clinic_exists(clinic_id: str) -> bool:
+    clinics = Base.metadata.tables["clinics"]
+    with engine.connect() as conn:
+        return conn.execute(select(clinics.c.id).where(clinics.c.id == clinic_id)).first() is not None
+
+
+class ShardEngineCache:
+    """LRU cache of per-clinic engines; idle shards beyond ``max_size`` are disposed."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._engines: "OrderedDict[str, Engine]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clinic_id: str) -> Engine:
+        with self._lock:
+            shard_engine = self._engines.get(clinic_id)
+            if shard_engine is not None:
+                self._engines.move_to_end(clinic_id)
+                return shard_engine
 
-def get_db() -> Iterator[Session]:
-    db = SessionLocal()
+            path = shard_path(clinic_id)
+            # Shards are created on first use, but only for clinics the catalog knows about
+            if not os.path.exists(path) and not _clinic_exists(clinic_id):
+                raise UnknownClinic(clinic_id)
+            shard_engine = create_engine(
+                f"sqlite:///{path}",
+                future=True,
+                connect_args={"check_same_thread": False},
+            )
+            Base.metadata.create_all(bind=shard_engine, tables=shard_tables())
+            self._engines[clinic_id] = shard_engine
+            while len(self._engines) > self.max_size:
+                _, evicted = self._engines.popitem(last=False)
+                evicted.dispose()
+            return shard_engine
+
+    def discard(self, clinic_id: str) -> None:
+        with self._lock:
+            shard_engine = self._engines.pop(clinic_id, None)
+        if shard_engine is not None:
+            shard_engine.dispose()
+
+    def dispose_all(self) -> None:
+        with self._lock:
+            for shard_engine in self._engines.values():
+                shard_engine.dispose()
+            self._engines.clear()
+
+
+shard_engines = ShardEngineCache(SHARD_CACHE_SIZE)
+
+
+class ShardKeyMissing(Exception):
+    def __str__(self) -> str:
+        return "clinicId is required to route this request in sharded mode"
+
+
+class ShardedSession(Session):
+    """Session that sends catalog tables to the main engine and the rest to the clinic shard."""
+
+    def __init__(self, *args, clinic_id: Optional[str] = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.clinic_id = clinic_id
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        table = getattr(mapper, "local_table", None) if mapper is not None else None
+        if table is not None and table.name in CATALOG_TABLES:
+            return engine
+        if table is None and self.clinic_id is None:
+            return engine
+        if self.clinic_id is None:
+            raise ShardKeyMissing()
+        return shard_engines.get(self.clinic_id)
+
+
+if SHARD_DIR:
+    SessionLocal = sessionmaker(class_=ShardedSession, autoflush=False, autocommit=False, future=True)
+else:
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+
+def open_session(clinic_id: Optional[str] = None) -> Session:
+    if SHARD_DIR:
+        return SessionLocal(clinic_id=clinic_id)
+    return SessionLocal()
+
+
+async def resolve_clinic_id(request: Request) -> Optional[str]:
+    """Find the shard key of a request: ``X-Clinic-Id`` header, ``clinicId`` query, or JSON body.
+
+    In sharded mode every source that names a clinic must name the same one, otherwise a
+    request could pass the checks for one clinic while writing to another clinic's shard.
+    """
+    if not SHARD_DIR:
+        return request.headers.get("x-clinic-id") or request.query_params.get("clinicId")
+    candidates = {request.headers.get("x-clinic-id"), request.query_params.get("clinicId")}
+    if request.method in ("POST", "PUT", "PATCH") and "json" in request.headers.get("content-type", ""):
+        try:
+            body = await request.json()
+        except ValueError:
+            body = None
+        if isinstance(body, dict) and isinstance(body.get("clinicId"), str):
+            candidates.add(body["clinicId"])
+    candidates.discard(None)
+    candidates.discard("")
+    if len(candidates) > 1:
+        raise HTTPException(status_code=400, detail="X-Clinic-Id header, clinicId query and body name different clinics")
+    return candidates.pop() if candidates else None
+
+
+def get_db(clinic_id: Optional[str] = Depends(resolve_clinic_id)) -> Iterator[Session]:
+    db = open_session(clinic_id)
     try:
         yield db
     finally:
@@ -43,8 +208,8 @@ def get_db() -> Iterator[Session]:
 
 
 @contextmanager
-def session_scope() -> Iterator[Session]:
-    session = SessionLocal()
+def session_scope(clinic_id: Optional[str] = None) -> Iterator[Session]:
+    session = open_session(clinic_id)
     try:
         yield session
         session.commit()
@@ -53,4 +218,3 @@ def session_scope() -> Iterator[Session]:
         raise
     finally:
         session.close()
-
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import os
+import re
+from collections import defaultdict
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+import audit
+import models
+
+PHONE_COUNTRY_CODE = os.getenv("SERKOR_PHONE_COUNTRY_CODE", "").lstrip("+")
+# Length of a national number without the trunk 0; longer numbers already carry a country code
+PHONE_LOCAL_DIGITS = int(os.getenv("SERKOR_PHONE_LOCAL_DIGITS", "9"))
+NAME_SIMILARITY = float(os.getenv("SERKOR_DUPLICATE_NAME_SIMILARITY", "0.85"))
+# Shorter numbers are placeholders ("0", "-", "123") rather than real phones
+MIN_PHONE_DIGITS = 6
+# Patients sharing a phone or birth date beyond this many are a placeholder value, not duplicates
+MAX_GROUP_SIZE = 200
+
+_NON_DIGITS = re.compile(r"\D")
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_phone(phone: Optional[str]) -> str:
+    """Digits-only phone number, with ``SERKOR_PHONE_COUNTRY_CODE`` added to local numbers.
+
+    ``+992 (90) 123-45-67``, ``00992901234567`` and, with country code 992, ``090 123 45 67``
+    all normalize to ``992901234567``. Whether a number is local is decided by its length,
+    not its first digits: ``992 12 34 56`` is a local number that happens to start with 992.
+    """
+    raw = (phone or "").strip()
+    digits = _NON_DIGITS.sub("", raw)
+    if raw.startswith("+"):
+        return digits
+    if digits.startswith("00"):
+        return digits[2:]
+    national = digits.lstrip("0")
+    if PHONE_COUNTRY_CODE and national and len(national) <= PHONE_LOCAL_DIGITS:
+        return PHONE_COUNTRY_CODE + national
+    return digits
+
+
+def _name_key(name: str) -> str:
+    # Word order and punctuation vary between receptionists ("Rahimov, Ali" / "Ali Rahimov")
+    return " ".join(sorted(_NON_WORD.sub(" ", name.casefold()).split()))
+
+
+def _similar_names(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    matcher = SequenceMatcher(None, a, b)
+    return (
+        matcher.real_quick_ratio() >= NAME_SIMILARITY
+        and matcher.quick_ratio() >= NAME_SIMILARITY
+        and matcher.ratio() >= NAME_SIMILARITY
+    )
+
+
+def _known_birth_date(date_of_birth: datetime, created_at: Optional[datetime]) -> bool:
+    # Patients saved without a birth date get the creation time instead, which says nothing
+    return created_at is None or date_of_birth.date() != created_at.date()
+
+
+class _Clusters:
+    """Union-find over row positions that remembers why rows were joined."""
+
+    def __init__(self, size: int) -> None:
+        self.parent = list(range(size))
+        self.reasons: Dict[Tuple[int, int], Set[str]] = defaultdict(set)
+
+    def find(self, item: int) -> int:
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def join(self, a: int, b: int, reason: str) -> None:
+        self.reasons[(a, b)].add(reason)
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+    def groups(self) -> List[Tuple[List[int], Set[str]]]:
+        members: Dict[int, List[int]] = defaultdict(list)
+        for item in range(len(self.parent)):
+            members[self.find(item)].append(item)
+        reasons: Dict[int, Set[str]] = defaultdict(set)
+        for (a, _b), why in self.reasons.items():
+            reasons[self.find(a)] |= why
+        return [(items, reasons[root]) for root, items in members.items() if len(items) > 1]
+
+
+def find_duplicates(db: Session, clinic_id: str) -> List[Dict[str, Any]]:
+    """Group a clinic's patients into clusters that are probably the same person.
+
+    Reads the clinic's patients in one query. Two patients are linked when they share a
+    normalized phone number, or a known birth date and a similar name.
+    """
+    rows = db.execute(
+        select(
+            models.Patient.id,
+            models.Patient.name,
+            models.Patient.phone,
+            models.Patient.phone_normalized,
+            models.Patient.date_of_birth,
+            models.Patient.created_at,
+        ).where(models.Patient.clinic_id == clinic_id)
+    ).all()
+
+    by_phone: Dict[str, List[int]] = defaultdict(list)
+    by_birth_date: Dict[Any, List[int]] = defaultdict(list)
+    for position, row in enumerate(rows):
+        if len(row.phone_normalized) >= MIN_PHONE_DIGITS:
+            by_phone[row.phone_normalized].append(position)
+        if _known_birth_date(row.date_of_birth, row.created_at):
+            by_birth_date[row.date_of_birth.date()].append(position)
+
+    clusters = _Clusters(len(rows))
+    for positions in by_phone.values():
+        if 1 < len(positions) <= MAX_GROUP_SIZE:
+            for position in positions[1:]:
+                clusters.join(positions[0], position, "phone")
+    names = [_name_key(row.name) for row in rows]
+    for positions in by_birth_date.values():
+        if not 1 < len(positions) <= MAX_GROUP_SIZE:
+            continue
+        for index, a in enumerate(positions):
+            for b in positions[index + 1 :]:
+                if _similar_names(names[a], names[b]):
+                    clusters.join(a, b, "nameAndDateOfBirth")
+
+    result = [
+        {
+            # Oldest record first: it is usually the one to keep
+            "patients": sorted((rows[position] for position in positions), key=lambda row: row.created_at or datetime.min),
+            "reasons": sorted(reasons),
+        }
+        for positions, reasons in clusters.groups()
+    ]
+    result.sort(key=lambda cluster: -len(cluster["patients"]))
+    return result
+
+
+def _fold_into(target: models.Patient, sources: List[models.Patient]) -> None:
+    """Copy what the target is missing from the duplicates being merged into it."""
+    for source in sources:
+        if not target.email and source.email:
+            target.email = source.email
+        if not target.address and source.address:
+            target.address = source.address
+        if not _known_birth_date(target.date_of_birth, target.created_at) and _known_birth_date(
+            source.date_of_birth, source.created_at
+        ):
+            target.date_of_birth = source.date_of_birth
+        if source.notes and source.notes not in (target.notes or ""):
+            target.notes = f"{target.notes}\n\n{source.notes}" if target.notes else source.notes
+        target.services = list(dict.fromkeys([*(target.services or []), *(source.services or [])]))
+        teeth = {tooth["toothNumber"]: tooth for tooth in source.teeth or []}
+        teeth.update({tooth["toothNumber"]: tooth for tooth in target.teeth or []})
+        target.teeth = [teeth[number] for number in sorted(teeth)]
+        target.balance = (target.balance or 0) + (source.balance or 0)
+
+
+def merge_patients(db: Session, clinic_id: str, target_id: str, source_ids: List[str]) -> Dict[str, Any]:
+    """Merge ``source_ids`` into ``target_id`` without committing.
+
+    Visits, archived visits and files are re-pointed with one UPDATE per table and the
+    duplicates are removed with one DELETE, so nothing is loaded row by row.
+    """
+    source_ids = [patient_id for patient_id in dict.fromkeys(source_ids) if patient_id != target_id]
+    if not source_ids:
+        raise HTTPException(status_code=400, detail="Nothing to merge")
+
+    patients = {
+        patient.id: patient
+        for patient in db.execute(
+            select(models.Patient).where(
+                models.Patient.id.in_([target_id, *source_ids]), models.Patient.clinic_id == clinic_id
+            )
+        ).scalars()
+    }
+    missing = [patient_id for patient_id in (target_id, *source_ids) if patient_id not in patients]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Patient not found: {', '.join(missing)}")
+    target = patients[target_id]
+    sources = [patients[patient_id] for patient_id in source_ids]
+
+    moved: Dict[str, Any] = {"merged": source_ids}
+    for key, model, values in (
+        ("visits", models.Visit, {"updated_at": datetime.utcnow()}),
+        ("archivedVisits", models.ArchivedVisit, {}),
+        ("files", models.PatientFile, {}),
+    ):
+        result = db.execute(
+            update(model)
+            .where(model.patient_id.in_(source_ids))
+            .values(patient_id=target_id, **values)
+            .execution_options(synchronize_session=False)
+        )
+        moved[key] = result.rowcount
+
+    _fold_into(target, sources)
+    db.execute(
+        delete(models.Patient).where(models.Patient.id.in_(source_ids)).execution_options(synchronize_session=False)
+    )
+    for source in sources:
+        audit.record(db, "patients", source.id, clinic_id, "delete", {"mergedInto": {"before": None, "after": target_id}})
+        db.expunge(source)
+    audit.record(
+        db,
+        "patients",
+        target_id,
+        clinic_id,
+        "merge",
+        {key: {"before": None, "after": value} for key, value in moved.items()},
+    )
+    return moved
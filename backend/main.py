@@ -1,23 +1,72 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import heapq
+import json
 import os
-from datetime import datetime
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
 from typing import Any, Iterable, List, Optional, Union
 
-from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sqlalchemy import func, select
-from sqlalchemy.orm import Session
-
-from database import Base, engine, get_db
+from fastapi.responses import FileResponse, JSONResponse
+from pydantic import ValidationError
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from database import (
+    SHARD_DIR,
+    Base,
+    ShardKeyMissing,
+    UnknownClinic,
+    catalog_tables,
+    engine,
+    get_db,
+    resolve_clinic_id,
+    session_scope,
+)
+import archive
+import audit
+import backup
+import concurrency
+import duplicates
 import models
+import offboarding
+import profiling
+import projections
 import schemas
+import series
+import streaming
+
+Base.metadata.create_all(bind=engine, tables=catalog_tables() if SHARD_DIR else None)
+
 
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    backup.scheduler.start()
+    offboarding.runner.start()
+    audit_task = asyncio.create_task(audit.writer.run())
+    try:
+        yield
+    finally:
+        audit_task.cancel()
+        await asyncio.gather(audit_task, return_exceptions=True)
+        await asyncio.to_thread(offboarding.runner.stop)
+        await asyncio.to_thread(audit.writer.flush)
+        backup.scheduler.stop()
 
-app = FastAPI(title="Serkor Backend")
 
+app = FastAPI(title="Serkor Backend", lifespan=lifespan, dependencies=[Depends(audit.bind_user)])
+
+app.router.route_class = profiling.ProfiledRoute
+
+app.add_middleware(profiling.ProfilingMiddleware)
+app.add_middleware(concurrency.RequestGateMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -42,6 +91,14 @@ def _ensure_unique_email(db: Session, email: str, user_id: Optional[str] = None)
         raise HTTPException(status_code=400, detail="User already exists")
 
 
+def _require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    expected = os.getenv("SERKOR_ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if x_admin_token != expected:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
 def _visit_services_to_db(services: Iterable[Union[str, schemas.VisitServicePayload]]) -> List[dict]:
     converted: List[dict] = []
     for item in services:
@@ -52,6 +109,62 @@ def _visit_services_to_db(services: Iterable[Union[str, schemas.VisitServicePayl
     return converted
 
 
+def _patch_values(patch: Any, columns: dict, required: Iterable[str] = ()) -> dict:
+    """Translate the fields present in a merge patch to column values."""
+    values = {}
+    for field in patch.model_fields_set:
+        value = getattr(patch, field)
+        if value is None and field in required:
+            raise HTTPException(status_code=400, detail=f"{field} cannot be null")
+        values[columns[field]] = value
+    return values
+
+
+def _apply_versioned_update(db: Session, entity: Any, values: dict, if_match: Optional[str], response: Response) -> None:
+    """Write ``values`` only if the row still has the ``updated_at`` the client last saw.
+
+    The UPDATE is guarded on ``updated_at`` so concurrent writers get a 412 instead of
+    silently overwriting each other. ``entity`` is patched in place, so the caller can
+    serialize it without reloading the row.
+    """
+    current = entity.updated_at
+    if if_match and if_match.strip('"') != current.isoformat():
+        raise HTTPException(status_code=412, detail="Record was modified by someone else")
+
+    model = type(entity)
+    values["updated_at"] = datetime.utcnow()
+    before = {key: getattr(entity, key) for key in values}
+    result = db.execute(
+        update(model)
+        .where(model.id == entity.id, model.updated_at == current)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        raise HTTPException(status_code=412, detail="Record was modified by someone else")
+    for key, value in values.items():
+        set_committed_value(entity, key, value)
+    audit.record(db, model.__tablename__, entity.id, entity.clinic_id, "update", audit.diff(before, values))
+    response.headers["ETag"] = f'"{values["updated_at"].isoformat()}"'
+
+
+@app.exception_handler(ShardKeyMissing)
+async def shard_key_missing_handler(_request, exc):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(UnknownClinic)
+async def unknown_clinic_handler(_request, exc):
+    return JSONResponse(status_code=404, content={"detail": str(exc)})
+
+
+@app.exception_handler(IntegrityError)
+async def integrity_error_handler(_request, _exc):
+    # Foreign keys are enforced; don't leak the failing SQL for a reference we didn't check
+    return JSONResponse(status_code=409, content={"detail": "Request conflicts with existing data"})
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(_request, exc):
     return JSONResponse(status_code=500, content={"error": str(exc)})
@@ -121,8 +234,7 @@ def list_users(
     return [schemas.UserResponse.model_validate(user) for user in users]
 
 
-@app.post("/api/users", response_model=schemas.UserResponse)
-def upsert_user(payload: schemas.UserPayload, db: Session = Depends(get_db)):
+def _save_user(db: Session, payload: schemas.UserPayload) -> models.User:
     clinic = _clinic_or_404(db, payload.clinicId)
     _ensure_unique_email(db, payload.email, payload.id)
 
@@ -141,7 +253,12 @@ def upsert_user(payload: schemas.UserPayload, db: Session = Depends(get_db)):
     user.role = payload.role
     if payload.createdAt:
         user.created_at = payload.createdAt
+    return user
+
 
+@app.post("/api/users", response_model=schemas.UserResponse)
+def upsert_user(payload: schemas.UserPayload, db: Session = Depends(get_db)):
+    user = _save_user(db, payload)
     db.commit()
     db.refresh(user)
     return schemas.UserResponse.model_validate(user)
@@ -160,9 +277,14 @@ def list_doctors(clinicId: Optional[str] = Query(None), db: Session = Depends(ge
     return [schemas.DoctorResponse.model_validate(doc) for doc in doctors]
 
 
-@app.post("/api/doctors", response_model=schemas.DoctorResponse)
-def upsert_doctor(payload: schemas.DoctorPayload, db: Session = Depends(get_db)):
+def _save_doctor(db: Session, payload: schemas.DoctorPayload) -> models.Doctor:
     clinic = _clinic_or_404(db, payload.clinicId)
+    if payload.userId:
+        user = db.get(models.User, payload.userId)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        if user.clinic_id != clinic.id:
+            raise HTTPException(status_code=400, detail="User belongs to another clinic")
 
     # Upsert: update if exists, create if not
     doctor_id = payload.id or schemas.create_id("doctor")
@@ -181,18 +303,27 @@ def upsert_doctor(payload: schemas.DoctorPayload, db: Session = Depends(get_db))
     doctor.phone = payload.phone
     doctor.color = payload.color
     doctor.user_id = payload.userId
+    return doctor
 
+
+@app.post("/api/doctors", response_model=schemas.DoctorResponse)
+def upsert_doctor(payload: schemas.DoctorPayload, db: Session = Depends(get_db)):
+    doctor = _save_doctor(db, payload)
     db.commit()
     db.refresh(doctor)
     return schemas.DoctorResponse.model_validate(doctor)
 
 
-@app.delete("/api/doctors")
-def delete_doctor(id: str = Query(...), clinicId: str = Query(...), db: Session = Depends(get_db)):
+def _delete_doctor(db: Session, id: str, clinicId: str) -> None:
     doctor = db.get(models.Doctor, id)
     if not doctor or doctor.clinic_id != clinicId:
         raise HTTPException(status_code=404, detail="Doctor not found")
     db.delete(doctor)
+
+
+@app.delete("/api/doctors")
+def delete_doctor(id: str = Query(...), clinicId: str = Query(...), db: Session = Depends(get_db)):
+    _delete_doctor(db, id, clinicId)
     db.commit()
     return {"success": True}
 
@@ -210,8 +341,7 @@ def list_services(clinicId: Optional[str] = Query(None), db: Session = Depends(g
     return [schemas.ServiceResponse.model_validate(service) for service in services]
 
 
-@app.post("/api/services", response_model=schemas.ServiceResponse)
-def upsert_service(payload: schemas.ServicePayload, db: Session = Depends(get_db)):
+def _save_service(db: Session, payload: schemas.ServicePayload) -> models.Service:
     clinic = _clinic_or_404(db, payload.clinicId)
 
     if payload.id:
@@ -227,18 +357,27 @@ def upsert_service(payload: schemas.ServicePayload, db: Session = Depends(get_db
 
     service.name = payload.name
     service.default_price = payload.defaultPrice
+    return service
 
+
+@app.post("/api/services", response_model=schemas.ServiceResponse)
+def upsert_service(payload: schemas.ServicePayload, db: Session = Depends(get_db)):
+    service = _save_service(db, payload)
     db.commit()
     db.refresh(service)
     return schemas.ServiceResponse.model_validate(service)
 
 
-@app.delete("/api/services")
-def delete_service(id: str = Query(...), clinicId: str = Query(...), db: Session = Depends(get_db)):
+def _delete_service(db: Session, id: str, clinicId: str) -> None:
     service = db.get(models.Service, id)
     if not service or service.clinic_id != clinicId:
         raise HTTPException(status_code=404, detail="Service not found")
     db.delete(service)
+
+
+@app.delete("/api/services")
+def delete_service(id: str = Query(...), clinicId: str = Query(...), db: Session = Depends(get_db)):
+    _delete_service(db, id, clinicId)
     db.commit()
     return {"success": True}
 
@@ -247,17 +386,49 @@ def delete_service(id: str = Query(...), clinicId: str = Query(...), db: Session
 
 
 @app.get("/api/patients", response_model=List[schemas.PatientResponse])
-def list_patients(clinicId: Optional[str] = Query(None), db: Session = Depends(get_db)):
+def list_patients(
+    clinicId: Optional[str] = Query(None),
+    phone: Optional[str] = Query(None, description="Only patients with this phone number, in any format"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name,phone"),
+    view: Optional[str] = Query(None, description="Predefined field set: compact"),
+    stream: Optional[str] = Query(None, pattern="^(json|ndjson)$", description="Stream the list as json or ndjson"),
+    shard_key: Optional[str] = Depends(resolve_clinic_id),
+    db: Session = Depends(get_db),
+):
+    names = projections.parse_fields(fields, view, projections.PATIENT_FIELDS, projections.PATIENT_VIEWS)
+    if names:
+        stmt = projections.patient_columns_stmt(names, clinicId)
+        if phone:
+            stmt = stmt.where(models.Patient.phone_normalized == duplicates.normalize_phone(phone))
+        if stream:
+            return streaming.stream(shard_key, [stmt], streaming.row_serializer(names), stream, entities=False)
+        rows = db.execute(stmt).mappings().all()
+        return JSONResponse(content=jsonable_encoder([dict(row) for row in rows]))
+
     stmt = select(models.Patient)
     if clinicId:
         stmt = stmt.where(models.Patient.clinic_id == clinicId)
+    if phone:
+        stmt = stmt.where(models.Patient.phone_normalized == duplicates.normalize_phone(phone))
     stmt = stmt.order_by(models.Patient.created_at.desc())
+    if stream:
+        return streaming.stream(shard_key, [stmt], streaming.entity_serializer(schemas.PatientResponse), stream)
     patients = db.execute(stmt).scalars().all()
     return [schemas.PatientResponse.model_validate(patient) for patient in patients]
 
 
-@app.post("/api/patients", response_model=schemas.PatientResponse)
-def upsert_patient(payload: schemas.PatientPayload, db: Session = Depends(get_db)):
+def _patient_email(email: Optional[str]) -> str:
+    # Validate email format if provided, otherwise use empty string
+    if email and email.strip():
+        email_value = email.strip()
+        # Basic email validation
+        if "@" not in email_value or len(email_value.split("@")) != 2:
+            raise HTTPException(status_code=400, detail="Invalid email format")
+        return email_value
+    return ""
+
+
+def _save_patient(db: Session, payload: schemas.PatientPayload) -> models.Patient:
     clinic = _clinic_or_404(db, payload.clinicId)
 
     # Upsert: update if exists, create if not
@@ -274,15 +445,8 @@ def upsert_patient(payload: schemas.PatientPayload, db: Session = Depends(get_db
 
     patient.name = payload.name
     patient.phone = payload.phone
-    # Validate email format if provided, otherwise use empty string
-    if payload.email and payload.email.strip():
-        email_value = payload.email.strip()
-        # Basic email validation
-        if "@" not in email_value or len(email_value.split("@")) != 2:
-            raise HTTPException(status_code=400, detail="Invalid email format")
-        patient.email = email_value
-    else:
-        patient.email = ""
+    patient.phone_normalized = duplicates.normalize_phone(payload.phone)
+    patient.email = _patient_email(payload.email)
     patient.date_of_birth = payload.dateOfBirth if payload.dateOfBirth else datetime.utcnow()
     patient.is_child = payload.isChild
     patient.address = payload.address
@@ -292,18 +456,116 @@ def upsert_patient(payload: schemas.PatientPayload, db: Session = Depends(get_db
     patient.services = payload.services
     patient.balance = payload.balance
     patient.updated_at = payload.updatedAt or datetime.utcnow()
+    return patient
 
+
+@app.post("/api/patients", response_model=schemas.PatientResponse)
+def upsert_patient(payload: schemas.PatientPayload, db: Session = Depends(get_db)):
+    patient = _save_patient(db, payload)
     db.commit()
     db.refresh(patient)
     return schemas.PatientResponse.model_validate(patient)
 
 
-@app.delete("/api/patients")
-def delete_patient(id: str = Query(...), clinicId: str = Query(...), db: Session = Depends(get_db)):
-    patient = db.get(models.Patient, id)
+def _delete_patient(db: Session, id: str, clinicId: str) -> None:
+    # The delete cascades to visits, their payments and files; load them up front rather
+    # than one payments query per visit
+    patient = db.get(
+        models.Patient,
+        id,
+        options=[
+            selectinload(models.Patient.visits).selectinload(models.Visit.payments),
+            selectinload(models.Patient.files),
+        ],
+    )
     if not patient or patient.clinic_id != clinicId:
         raise HTTPException(status_code=404, detail="Patient not found")
+    archive.delete_patient_archive(db, id)
     db.delete(patient)
+
+
+_PATIENT_PATCH_COLUMNS = {
+    "name": "name",
+    "phone": "phone",
+    "email": "email",
+    "dateOfBirth": "date_of_birth",
+    "isChild": "is_child",
+    "address": "address",
+    "notes": "notes",
+    "status": "status",
+    "teeth": "teeth",
+    "services": "services",
+    "balance": "balance",
+}
+
+
+def _merge_teeth(current: list, teeth: Any) -> list:
+    if teeth is None:
+        return []
+    if isinstance(teeth, list):
+        return [tooth.model_dump() for tooth in teeth]
+    merged = {tooth["toothNumber"]: tooth for tooth in current or []}
+    for number, status in teeth.items():
+        if status is None:
+            merged.pop(number, None)
+        else:
+            merged[number] = {"toothNumber": number, "status": status}
+    return [merged[number] for number in sorted(merged)]
+
+
+@app.patch("/api/patients/{patient_id}", response_model=schemas.PatientResponse)
+def patch_patient(
+    patient_id: str,
+    patch: schemas.PatientPatch,
+    response: Response,
+    clinicId: str = Query(...),
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    patient = db.get(models.Patient, patient_id)
+    if not patient or patient.clinic_id != clinicId:
+        raise HTTPException(status_code=404, detail="Patient not found")
+
+    values = _patch_values(
+        patch, _PATIENT_PATCH_COLUMNS, required=("name", "phone", "dateOfBirth", "isChild", "status", "balance")
+    )
+    if "phone" in values:
+        values["phone_normalized"] = duplicates.normalize_phone(values["phone"])
+    if "email" in values:
+        values["email"] = _patient_email(values["email"])
+    if "teeth" in values:
+        values["teeth"] = _merge_teeth(patient.teeth, patch.teeth)
+    if "services" in values and values["services"] is None:
+        values["services"] = []
+
+    _apply_versioned_update(db, patient, values, if_match, response)
+    result = schemas.PatientResponse.model_validate(patient)
+    db.commit()
+    return result
+
+
+@app.get("/api/patients/duplicates", response_model=List[schemas.DuplicateCluster])
+def list_duplicate_patients(clinicId: str = Query(...), db: Session = Depends(get_db)):
+    return [
+        schemas.DuplicateCluster(
+            patients=[schemas.DuplicatePatient.model_validate(row) for row in cluster["patients"]],
+            reasons=cluster["reasons"],
+        )
+        for cluster in duplicates.find_duplicates(db, clinicId)
+    ]
+
+
+@app.post("/api/patients/merge", response_model=schemas.PatientMergeResponse)
+def merge_patients(payload: schemas.PatientMergePayload, db: Session = Depends(get_db)):
+    moved = duplicates.merge_patients(db, payload.clinicId, payload.targetId, payload.sourceIds)
+    db.commit()
+    patient = db.get(models.Patient, payload.targetId)
+    return schemas.PatientMergeResponse(patient=schemas.PatientResponse.model_validate(patient), **moved)
+
+
+@app.delete("/api/patients")
+def delete_patient(id: str = Query(...), clinicId: str = Query(...), db: Session = Depends(get_db)):
+    _delete_patient(db, id, clinicId)
     db.commit()
     return {"success": True}
 
@@ -311,18 +573,47 @@ def delete_patient(id: str = Query(...), clinicId: str = Query(...), db: Session
 # Visits ----------------------------------------------------------------------
 
 
+def _visits_stmt(model, clinic_id: Optional[str]):
+    stmt = select(model)
+    if clinic_id:
+        stmt = stmt.where(model.clinic_id == clinic_id)
+    return stmt.order_by(model.start_time.desc())
+
+
 @app.get("/api/visits", response_model=List[schemas.VisitResponse])
-def list_visits(clinicId: Optional[str] = Query(None), db: Session = Depends(get_db)):
-    stmt = select(models.Visit)
-    if clinicId:
-        stmt = stmt.where(models.Visit.clinic_id == clinicId)
-    stmt = stmt.order_by(models.Visit.start_time.desc())
-    visits = db.execute(stmt).scalars().all()
+def list_visits(
+    clinicId: Optional[str] = Query(None),
+    includeArchived: bool = Query(False),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,startTime,status"),
+    view: Optional[str] = Query(None, description="Predefined field set: calendar"),
+    stream: Optional[str] = Query(None, pattern="^(json|ndjson)$", description="Stream the list as json or ndjson"),
+    shard_key: Optional[str] = Depends(resolve_clinic_id),
+    db: Session = Depends(get_db),
+):
+    names = projections.parse_fields(fields, view, projections.VISIT_FIELDS, projections.VISIT_VIEWS)
+    sources = [models.Visit, models.ArchivedVisit] if includeArchived else [models.Visit]
+
+    if names:
+        statements = [projections.visit_columns_stmt(model, names, clinicId) for model in sources]
+        sort_key = lambda row: row[projections.SORT_KEY]  # noqa: E731
+        if stream:
+            serialize = streaming.row_serializer(names)
+            return streaming.stream(shard_key, statements, serialize, stream, entities=False, merge_key=sort_key)
+        results = [db.execute(stmt).mappings().all() for stmt in statements]
+        rows = heapq.merge(*results, key=sort_key, reverse=True)
+        return JSONResponse(content=jsonable_encoder([{key: row[key] for key in names} for row in rows]))
+
+    statements = [_visits_stmt(model, clinicId) for model in sources]
+    sort_key = lambda visit: visit.start_time  # noqa: E731
+    if stream:
+        serialize = streaming.entity_serializer(schemas.VisitResponse)
+        return streaming.stream(shard_key, statements, serialize, stream, merge_key=sort_key)
+    results = [db.execute(stmt).scalars().all() for stmt in statements]
+    visits = heapq.merge(*results, key=sort_key, reverse=True)
     return [schemas.VisitResponse.model_validate(visit) for visit in visits]
 
 
-@app.post("/api/visits", response_model=schemas.VisitResponse)
-def upsert_visit(payload: schemas.VisitPayload, db: Session = Depends(get_db)):
+def _save_visit(db: Session, payload: schemas.VisitPayload) -> models.Visit:
     clinic = _clinic_or_404(db, payload.clinicId)
     patient = db.get(models.Patient, payload.patientId)
     if not patient:
@@ -362,44 +653,259 @@ def upsert_visit(payload: schemas.VisitPayload, db: Session = Depends(get_db)):
     visit.status = payload.status
     visit.treated_teeth = payload.treatedTeeth
     visit.updated_at = datetime.utcnow()
+    return visit
 
+
+@app.post("/api/visits", response_model=schemas.VisitResponse)
+def upsert_visit(payload: schemas.VisitPayload, db: Session = Depends(get_db)):
+    visit = _save_visit(db, payload)
     db.commit()
     db.refresh(visit)
     return schemas.VisitResponse.model_validate(visit)
 
 
-@app.delete("/api/visits")
-def delete_visit(id: str = Query(...), clinicId: str = Query(...), db: Session = Depends(get_db)):
+def _delete_visit(db: Session, id: str, clinicId: str) -> None:
     visit = db.get(models.Visit, id)
     if not visit or visit.clinic_id != clinicId:
         raise HTTPException(status_code=404, detail="Visit not found")
     db.delete(visit)
+
+
+_VISIT_PATCH_COLUMNS = {
+    "patientId": "patient_id",
+    "doctorId": "doctor_id",
+    "startTime": "start_time",
+    "endTime": "end_time",
+    "services": "services",
+    "cost": "cost",
+    "notes": "notes",
+    "status": "status",
+    "treatedTeeth": "treated_teeth",
+}
+
+
+@app.patch("/api/visits/{visit_id}", response_model=schemas.VisitResponse)
+def patch_visit(
+    visit_id: str,
+    patch: schemas.VisitPatch,
+    response: Response,
+    clinicId: str = Query(...),
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    visit = db.get(models.Visit, visit_id)
+    if not visit or visit.clinic_id != clinicId:
+        raise HTTPException(status_code=404, detail="Visit not found")
+
+    values = _patch_values(
+        patch, _VISIT_PATCH_COLUMNS, required=("patientId", "startTime", "endTime", "cost", "status")
+    )
+    if "patient_id" in values:
+        patient = db.get(models.Patient, values["patient_id"])
+        if not patient:
+            raise HTTPException(status_code=404, detail="Patient not found")
+        if patient.clinic_id != clinicId:
+            raise HTTPException(status_code=400, detail="Patient belongs to another clinic")
+    if values.get("doctor_id") and not db.get(models.Doctor, values["doctor_id"]):
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    if "services" in values:
+        values["services"] = _visit_services_to_db(values["services"] or [])
+    if "treated_teeth" in values and values["treated_teeth"] is None:
+        values["treated_teeth"] = []
+
+    _apply_versioned_update(db, visit, values, if_match, response)
+    result = schemas.VisitResponse.model_validate(visit)
+    db.commit()
+    return result
+
+
+@app.delete("/api/visits")
+def delete_visit(id: str = Query(...), clinicId: str = Query(...), db: Session = Depends(get_db)):
+    _delete_visit(db, id, clinicId)
     db.commit()
     return {"success": True}
 
 
-# Payments --------------------------------------------------------------------
+def _series_conflicts(slots: List[Any], conflicts: List[Any]) -> List[schemas.VisitConflict]:
+    return [
+        schemas.VisitConflict(startTime=slots[index][0], endTime=slots[index][1], visitId=visit_id)
+        for index, visit_id in conflicts
+    ]
 
 
-@app.post("/api/payments", response_model=schemas.PaymentResponse)
-def add_payment(payload: schemas.PaymentPayload, db: Session = Depends(get_db)):
-    visit = db.get(models.Visit, payload.visitId)
-    if not visit:
-        raise HTTPException(status_code=404, detail="Visit not found")
+def _raise_series_conflicts(conflicts: List[schemas.VisitConflict]) -> None:
+    raise HTTPException(
+        status_code=409,
+        detail={
+            "message": "Doctor is already booked at some of these times",
+            "conflicts": [conflict.model_dump(mode="json") for conflict in conflicts],
+        },
+    )
 
-    payment = models.Payment(
-        id=payload.id or schemas.create_id("payment"),
-        visit=visit,
-        amount=payload.amount,
-        method=payload.method,
-        date=payload.date or datetime.utcnow(),
+
+@app.post("/api/visits/series", response_model=schemas.VisitSeriesResponse)
+def create_visit_series(payload: schemas.VisitSeriesPayload, db: Session = Depends(get_db)):
+    if payload.endTime <= payload.startTime:
+        raise HTTPException(status_code=400, detail="endTime must be after startTime")
+    try:
+        starts = series.occurrences(payload.recurrence, payload.startTime)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    duration = payload.endTime - payload.startTime
+    slots = [(start, start + duration) for start in starts]
+    # Occurrences come in order, so checking neighbours is enough
+    if any(start < previous_end for (_start, previous_end), (start, _end) in zip(slots, slots[1:])):
+        raise HTTPException(status_code=400, detail="Visits in this series would overlap each other")
+    conflicts = _series_conflicts(slots, series.find_conflicts(db, payload.doctorId, slots))
+    # Skipping every occurrence would leave a series without visits
+    if conflicts and (not payload.skipConflicts or len(conflicts) == len(slots)):
+        _raise_series_conflicts(conflicts)
+
+    series_id = schemas.create_id("series")
+    taken = {conflict.startTime for conflict in conflicts}
+    visits = []
+    for start, end in slots:
+        if start in taken:
+            continue
+        visit = _save_visit(
+            db,
+            schemas.VisitPayload(
+                patientId=payload.patientId,
+                doctorId=payload.doctorId,
+                clinicId=payload.clinicId,
+                startTime=start,
+                endTime=end,
+                services=payload.services,
+                cost=payload.cost,
+                notes=payload.notes,
+            ),
+        )
+        visit.series_id = series_id
+        visits.append(visit)
+    # All occurrences go out in one flush; serialize before commit expires them
+    db.flush()
+    result = schemas.VisitSeriesResponse(
+        seriesId=series_id,
+        visits=[schemas.VisitResponse.model_validate(visit) for visit in visits],
+        conflicts=conflicts,
     )
-    db.add(payment)
+    db.commit()
+    return result
 
+
+_SERIES_PATCH_COLUMNS = {"doctorId": "doctor_id", "notes": "notes", "status": "status"}
+
+
+@app.patch("/api/visits/series/{series_id}", response_model=schemas.VisitSeriesResponse)
+def patch_visit_series(
+    series_id: str,
+    patch: schemas.VisitSeriesPatch,
+    clinicId: str = Query(...),
+    db: Session = Depends(get_db),
+):
+    values = {
+        column: getattr(patch, field)
+        for field, column in _SERIES_PATCH_COLUMNS.items()
+        if field in patch.model_fields_set
+    }
+    if "status" in values and values["status"] is None:
+        raise HTTPException(status_code=400, detail="status cannot be null")
+    shift = timedelta(minutes=patch.shiftMinutes or 0)
+    if not values and not shift:
+        raise HTTPException(status_code=400, detail="Nothing to change")
+    if values.get("doctor_id"):
+        doctor = db.get(models.Doctor, values["doctor_id"])
+        if not doctor or doctor.clinic_id != clinicId:
+            raise HTTPException(status_code=404, detail="Doctor not found")
+
+    rows = db.execute(
+        select(
+            models.Visit.id,
+            models.Visit.doctor_id,
+            models.Visit.start_time,
+            models.Visit.end_time,
+            models.Visit.notes,
+            models.Visit.status,
+            models.Visit.updated_at,
+        )
+        .where(
+            models.Visit.series_id == series_id,
+            models.Visit.start_time >= (patch.fromTime or datetime.utcnow()),
+            models.Visit.clinic_id == clinicId,
+            models.Visit.status == "scheduled",
+        )
+        .order_by(models.Visit.start_time)
+    ).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="No scheduled visits left in this series")
+    ids = [row.id for row in rows]
+
+    if values.get("status", "scheduled") == "scheduled" and ("doctor_id" in values or shift):
+        by_doctor: dict = {}
+        for row in rows:
+            by_doctor.setdefault(values.get("doctor_id", row.doctor_id), []).append(
+                (row.start_time + shift, row.end_time + shift)
+            )
+        conflicts = []
+        for doctor_id, slots in by_doctor.items():
+            conflicts += _series_conflicts(slots, series.find_conflicts(db, doctor_id, slots, exclude_ids=ids))
+        if conflicts:
+            _raise_series_conflicts(conflicts)
+
+    values["updated_at"] = datetime.utcnow()
+    if shift:
+        # One UPDATE executed with a parameter set per visit, since each gets its own times
+        db.execute(
+            update(models.Visit),
+            [
+                {"id": row.id, "start_time": row.start_time + shift, "end_time": row.end_time + shift, **values}
+                for row in rows
+            ],
+        )
+    else:
+        db.execute(
+            update(models.Visit)
+            .where(models.Visit.id.in_(ids))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+    for row in rows:
+        after = {**values, "start_time": row.start_time + shift, "end_time": row.end_time + shift}
+        audit.record(db, "visits", row.id, clinicId, "update", audit.diff(row._asdict(), after))
+
+    visits = db.execute(
+        select(models.Visit).where(models.Visit.id.in_(ids)).order_by(models.Visit.start_time)
+    ).scalars()
+    result = schemas.VisitSeriesResponse(
+        seriesId=series_id, visits=[schemas.VisitResponse.model_validate(visit) for visit in visits]
+    )
     db.commit()
-    db.refresh(payment)
+    return result
 
-    # Recalculate cash and ewallet totals
+
+# Payments --------------------------------------------------------------------
+
+
+@app.get("/api/payments", response_model=List[schemas.PaymentResponse])
+def list_payments(
+    visitId: str = Query(...),
+    includeArchived: bool = Query(False),
+    db: Session = Depends(get_db),
+):
+    stmt = select(models.Payment).where(models.Payment.visit_id == visitId).order_by(models.Payment.date.asc())
+    payments = [schemas.PaymentResponse.model_validate(payment) for payment in db.execute(stmt).scalars().all()]
+    if includeArchived:
+        archived_stmt = select(models.ArchivedPayment).where(models.ArchivedPayment.visit_id == visitId)
+        payments.extend(
+            schemas.PaymentResponse.model_validate(payment) for payment in db.execute(archived_stmt).scalars().all()
+        )
+        payments.sort(key=lambda payment: payment.date)
+    return payments
+
+
+def _recalculate_visit_totals(db: Session, visit: models.Visit) -> None:
+    db.flush()
     cash_total = db.scalar(
         select(func.coalesce(func.sum(models.Payment.amount), 0)).where(
             models.Payment.visit_id == visit.id, models.Payment.method == "cash"
@@ -412,36 +918,47 @@ def add_payment(payload: schemas.PaymentPayload, db: Session = Depends(get_db)):
     )
     visit.cash_amount = float(cash_total or 0)
     visit.ewallet_amount = float(wallet_total or 0)
-    db.commit()
 
+
+def _save_payment(db: Session, payload: schemas.PaymentPayload) -> models.Payment:
+    visit = db.get(models.Visit, payload.visitId)
+    if not visit:
+        raise HTTPException(status_code=404, detail="Visit not found")
+
+    payment = models.Payment(
+        id=payload.id or schemas.create_id("payment"),
+        visit=visit,
+        amount=payload.amount,
+        method=payload.method,
+        date=payload.date or datetime.utcnow(),
+    )
+    db.add(payment)
+    _recalculate_visit_totals(db, visit)
+    return payment
+
+
+@app.post("/api/payments", response_model=schemas.PaymentResponse)
+def add_payment(payload: schemas.PaymentPayload, db: Session = Depends(get_db)):
+    payment = _save_payment(db, payload)
+    db.commit()
+    db.refresh(payment)
     return schemas.PaymentResponse.model_validate(payment)
 
 
-@app.delete("/api/payments/{payment_id}")
-def delete_payment(payment_id: str, db: Session = Depends(get_db)):
-    payment = db.get(models.Payment, payment_id)
-    if not payment:
+def _delete_payment(db: Session, id: str, clinicId: Optional[str] = None) -> None:
+    payment = db.get(models.Payment, id)
+    if not payment or (clinicId and payment.visit.clinic_id != clinicId):
         raise HTTPException(status_code=404, detail="Payment not found")
-    visit_id = payment.visit_id
+    visit = payment.visit
     db.delete(payment)
-    db.commit()
-
-    visit = db.get(models.Visit, visit_id)
     if visit:
-        cash_total = db.scalar(
-            select(func.coalesce(func.sum(models.Payment.amount), 0)).where(
-                models.Payment.visit_id == visit.id, models.Payment.method == "cash"
-            )
-        )
-        wallet_total = db.scalar(
-            select(func.coalesce(func.sum(models.Payment.amount), 0)).where(
-                models.Payment.visit_id == visit.id, models.Payment.method == "ewallet"
-            )
-        )
-        visit.cash_amount = float(cash_total or 0)
-        visit.ewallet_amount = float(wallet_total or 0)
-        db.commit()
+        _recalculate_visit_totals(db, visit)
+
 
+@app.delete("/api/payments/{payment_id}")
+def delete_payment(payment_id: str, db: Session = Depends(get_db)):
+    _delete_payment(db, payment_id)
+    db.commit()
     return {"success": True}
 
 
@@ -452,6 +969,8 @@ def delete_payment(payment_id: str, db: Session = Depends(get_db)):
 def list_files(
     patientId: Optional[str] = Query(None),
     clinicId: Optional[str] = Query(None),
+    stream: Optional[str] = Query(None, pattern="^(json|ndjson)$", description="Stream the list as json or ndjson"),
+    shard_key: Optional[str] = Depends(resolve_clinic_id),
     db: Session = Depends(get_db),
 ):
     stmt = select(models.PatientFile)
@@ -460,12 +979,13 @@ def list_files(
     if clinicId:
         stmt = stmt.where(models.PatientFile.clinic_id == clinicId)
     stmt = stmt.order_by(models.PatientFile.uploaded_at.desc())
+    if stream:
+        return streaming.stream(shard_key, [stmt], streaming.entity_serializer(schemas.PatientFileResponse), stream)
     files = db.execute(stmt).scalars().all()
     return [schemas.PatientFileResponse.model_validate(file) for file in files]
 
 
-@app.post("/api/files", response_model=schemas.PatientFileResponse)
-def upsert_file(payload: schemas.PatientFilePayload, db: Session = Depends(get_db)):
+def _save_file(db: Session, payload: schemas.PatientFilePayload) -> models.PatientFile:
     clinic = _clinic_or_404(db, payload.clinicId)
     patient = db.get(models.Patient, payload.patientId)
     if not patient:
@@ -486,22 +1006,307 @@ def upsert_file(payload: schemas.PatientFilePayload, db: Session = Depends(get_d
 
     file.name = payload.name
     file.file_url = payload.file
+    return file
 
+
+@app.post("/api/files", response_model=schemas.PatientFileResponse)
+def upsert_file(payload: schemas.PatientFilePayload, db: Session = Depends(get_db)):
+    file = _save_file(db, payload)
     db.commit()
     db.refresh(file)
     return schemas.PatientFileResponse.model_validate(file)
 
 
-@app.delete("/api/files")
-def delete_file(id: str = Query(...), clinicId: str = Query(...), db: Session = Depends(get_db)):
+def _delete_file(db: Session, id: str, clinicId: str) -> None:
     file = db.get(models.PatientFile, id)
     if not file or file.clinic_id != clinicId:
         raise HTTPException(status_code=404, detail="File not found")
     db.delete(file)
+
+
+@app.delete("/api/files")
+def delete_file(id: str = Query(...), clinicId: str = Query(...), db: Session = Depends(get_db)):
+    _delete_file(db, id, clinicId)
     db.commit()
     return {"success": True}
 
 
+# Batch -----------------------------------------------------------------------
+
+_BATCH_UPSERTS = {
+    "users": (schemas.UserPayload, _save_user, schemas.UserResponse),
+    "doctors": (schemas.DoctorPayload, _save_doctor, schemas.DoctorResponse),
+    "services": (schemas.ServicePayload, _save_service, schemas.ServiceResponse),
+    "patients": (schemas.PatientPayload, _save_patient, schemas.PatientResponse),
+    "visits": (schemas.VisitPayload, _save_visit, schemas.VisitResponse),
+    "payments": (schemas.PaymentPayload, _save_payment, schemas.PaymentResponse),
+    "files": (schemas.PatientFilePayload, _save_file, schemas.PatientFileResponse),
+}
+
+# Keys only need to outlive a client's retries; older ones are pruned when new keys are stored
+IDEMPOTENCY_KEY_TTL_HOURS = float(os.getenv("SERKOR_IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+
+_BATCH_DELETES = {
+    "doctors": _delete_doctor,
+    "services": _delete_service,
+    "patients": _delete_patient,
+    "visits": _delete_visit,
+    "payments": _delete_payment,
+    "files": _delete_file,
+}
+
+
+def _batch_hash(payload: schemas.BatchPayload) -> str:
+    operations = [operation.model_dump(mode="json") for operation in payload.operations]
+    return hashlib.sha256(json.dumps(operations, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def _idempotency_cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+
+
+def _stored_batch(db: Session, payload: schemas.BatchPayload, request_hash: str) -> Optional[schemas.BatchResponse]:
+    """Return the stored response for a retried batch, or None if the key is new or expired."""
+    stored = db.get(models.IdempotencyKey, {"clinic_id": payload.clinicId, "key": payload.idempotencyKey})
+    if not stored:
+        return None
+    if stored.created_at < _idempotency_cutoff():
+        # Pruned together with the other expired keys before the new one is stored
+        db.expunge(stored)
+        return None
+    if stored.request_hash != request_hash:
+        raise HTTPException(status_code=422, detail="idempotencyKey was already used for a different batch")
+    return schemas.BatchResponse.model_validate({**stored.response, "replayed": True})
+
+
+def _apply_batch_operation(db: Session, operation: schemas.BatchOperation, clinic_id: Optional[str]) -> schemas.BatchResult:
+    if operation.op == "delete":
+        delete = _BATCH_DELETES.get(operation.resource)
+        if delete is None:
+            raise HTTPException(status_code=400, detail=f"Deleting {operation.resource} is not supported")
+        if not operation.id:
+            raise HTTPException(status_code=400, detail="id is required for delete")
+        if clinic_id and operation.clinicId and operation.clinicId != clinic_id:
+            raise HTTPException(status_code=400, detail="clinicId differs from the batch clinicId")
+        delete(db, operation.id, operation.clinicId or clinic_id)
+        db.flush()
+        return schemas.BatchResult(op=operation.op, resource=operation.resource, id=operation.id)
+
+    data_clinic_id = (operation.data or {}).get("clinicId")
+    if clinic_id and data_clinic_id and data_clinic_id != clinic_id:
+        raise HTTPException(status_code=400, detail="data.clinicId differs from the batch clinicId")
+    payload_model, save, response_model = _BATCH_UPSERTS[operation.resource]
+    entity = save(db, payload_model.model_validate(operation.data or {}))
+    db.flush()
+    return schemas.BatchResult(
+        op=operation.op,
+        resource=operation.resource,
+        id=entity.id,
+        result=response_model.model_validate(entity).model_dump(by_alias=True, mode="json"),
+    )
+
+
+@app.post("/api/batch", response_model=schemas.BatchResponse)
+def run_batch(payload: schemas.BatchPayload, db: Session = Depends(get_db)):
+    """Apply an ordered list of upserts/deletes in a single all-or-nothing transaction."""
+    request_hash = _batch_hash(payload)
+    if payload.idempotencyKey:
+        if not payload.clinicId:
+            raise HTTPException(status_code=400, detail="clinicId is required with idempotencyKey")
+        stored = _stored_batch(db, payload, request_hash)
+        if stored:
+            return stored
+
+    results: List[schemas.BatchResult] = []
+    try:
+        for index, operation in enumerate(payload.operations):
+            try:
+                results.append(_apply_batch_operation(db, operation, payload.clinicId))
+            except HTTPException as exc:
+                raise HTTPException(
+                    status_code=exc.status_code,
+                    detail=f"Operation {index} ({operation.op} {operation.resource}) failed: {exc.detail}",
+                )
+            except ValidationError as exc:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Operation {index} ({operation.op} {operation.resource}) is invalid: {exc}",
+                )
+
+        response = schemas.BatchResponse(idempotencyKey=payload.idempotencyKey, results=results)
+        if payload.idempotencyKey:
+            db.execute(
+                delete(models.IdempotencyKey)
+                .where(models.IdempotencyKey.created_at < _idempotency_cutoff())
+                .execution_options(synchronize_session=False)
+            )
+            db.add(
+                models.IdempotencyKey(
+                    clinic_id=payload.clinicId,
+                    key=payload.idempotencyKey,
+                    request_hash=request_hash,
+                    response=response.model_dump(mode="json"),
+                )
+            )
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        # A concurrent retry with the same key committed first
+        stored = _stored_batch(db, payload, request_hash) if payload.idempotencyKey else None
+        if not stored:
+            raise
+        return stored
+    except Exception:
+        db.rollback()
+        raise
+    return response
+
+
+# Audit -----------------------------------------------------------------------
+
+
+@app.get("/api/audit", response_model=List[schemas.AuditLogResponse])
+def list_audit_log(
+    clinicId: str = Query(...),
+    entity: Optional[str] = Query(None, description="Table name, e.g. visits or payments"),
+    entityId: Optional[str] = Query(None),
+    before: Optional[datetime] = Query(None, description="Only entries older than this time"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    stmt = select(models.AuditLog).where(models.AuditLog.clinic_id == clinicId)
+    if entity:
+        stmt = stmt.where(models.AuditLog.entity == entity)
+    if entityId:
+        stmt = stmt.where(models.AuditLog.entity_id == entityId)
+    if before:
+        stmt = stmt.where(models.AuditLog.created_at < before)
+    stmt = stmt.order_by(models.AuditLog.created_at.desc()).limit(limit)
+    entries = db.execute(stmt).scalars().all()
+    return [schemas.AuditLogResponse.model_validate(entry) for entry in entries]
+
+
+# Admin -----------------------------------------------------------------------
+
+
+@app.post("/api/admin/archive", dependencies=[Depends(_require_admin)])
+def archive_old_visits(
+    clinicId: Optional[str] = Query(None),
+    olderThanDays: int = Query(archive.ARCHIVE_AFTER_DAYS, ge=0),
+    batchSize: int = Query(archive.ARCHIVE_BATCH_SIZE, ge=1, le=10000),
+    db: Session = Depends(get_db),
+):
+    if clinicId or not SHARD_DIR:
+        moved = archive.archive_visits(db, clinic_id=clinicId, older_than_days=olderThanDays, batch_size=batchSize)
+        return {"success": True, "archived": moved}
+
+    moved = {"visits": 0, "payments": 0}
+    for clinic_id in db.execute(select(models.Clinic.id)).scalars().all():
+        with session_scope(clinic_id) as shard_db:
+            for key, count in archive.archive_visits(shard_db, clinic_id, olderThanDays, batchSize).items():
+                moved[key] += count
+    return {"success": True, "archived": moved}
+
+
+def _submit_offboarding(job: offboarding.OffboardingJob, work) -> schemas.OffboardingJobResponse:
+    try:
+        offboarding.runner.submit(job, work)
+    except offboarding.JobConflict as exc:
+        raise HTTPException(status_code=409, detail=f"Offboarding job {exc} is already running")
+    return schemas.OffboardingJobResponse.model_validate(job)
+
+
+@app.post(
+    "/api/admin/offboarding/doctors",
+    status_code=202,
+    response_model=schemas.OffboardingJobResponse,
+    dependencies=[Depends(_require_admin)],
+)
+def offboard_doctor(payload: schemas.DoctorOffboardingPayload, db: Session = Depends(get_db)):
+    doctor = db.get(models.Doctor, payload.doctorId)
+    if not doctor or doctor.clinic_id != payload.clinicId:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    if payload.reassignTo:
+        if payload.reassignTo == payload.doctorId:
+            raise HTTPException(status_code=400, detail="Cannot reassign visits to the same doctor")
+        replacement = db.get(models.Doctor, payload.reassignTo)
+        if not replacement or replacement.clinic_id != payload.clinicId:
+            raise HTTPException(status_code=404, detail="Replacement doctor not found")
+
+    job = offboarding.OffboardingJob("doctor", payload.clinicId, payload.doctorId)
+    since = payload.since or datetime.utcnow()
+    return _submit_offboarding(job, lambda: offboarding.offboard_doctor(job, payload.reassignTo, since))
+
+
+@app.post(
+    "/api/admin/offboarding/clinics",
+    status_code=202,
+    response_model=schemas.OffboardingJobResponse,
+    dependencies=[Depends(_require_admin)],
+)
+def purge_clinic(payload: schemas.ClinicPurgePayload, db: Session = Depends(get_db)):
+    _clinic_or_404(db, payload.clinicId)
+    job = offboarding.OffboardingJob("clinic", payload.clinicId, payload.clinicId)
+    return _submit_offboarding(job, lambda: offboarding.purge_clinic(job))
+
+
+@app.get(
+    "/api/admin/offboarding/jobs",
+    response_model=List[schemas.OffboardingJobResponse],
+    dependencies=[Depends(_require_admin)],
+)
+def list_offboarding_jobs():
+    return [schemas.OffboardingJobResponse.model_validate(job) for job in offboarding.runner.list()]
+
+
+@app.get(
+    "/api/admin/offboarding/jobs/{job_id}",
+    response_model=schemas.OffboardingJobResponse,
+    dependencies=[Depends(_require_admin)],
+)
+def get_offboarding_job(job_id: str):
+    job = offboarding.runner.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return schemas.OffboardingJobResponse.model_validate(job)
+
+
+@app.get("/api/admin/backups", dependencies=[Depends(_require_admin)])
+def list_backups():
+    return {"backups": backup.list_backups(), "lastScheduledError": backup.scheduler.last_error}
+
+
+@app.post("/api/admin/backups", dependencies=[Depends(_require_admin)])
+def create_backup():
+    try:
+        return {"success": True, "snapshots": backup.run_backup()}
+    except backup.BackupError as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+@app.post("/api/admin/backups/verify", dependencies=[Depends(_require_admin)])
+def verify_backup(file: str = Query(...)):
+    try:
+        return backup.verify_backup(backup.backup_path(file))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Backup not found")
+    except backup.BackupError as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+@app.get("/api/admin/profiles", dependencies=[Depends(_require_admin)])
+def list_profiles():
+    return {"profiles": profiling.list_profiles(), "sampleRate": profiling.PROFILE_SAMPLE_RATE}
+
+
+@app.get("/api/admin/profiles/{file}", dependencies=[Depends(_require_admin)])
+def download_profile(file: str):
+    try:
+        return FileResponse(profiling.profile_path(file), filename=file)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the indexes declared in models.py on an existing database.
+Run this once after upgrading; new databases get them automatically.
+"""
+from __future__ import annotations
+
+import glob
+import os
+import sys
+from sqlalchemy import create_engine
+from database import SHARD_DIR, Base, _build_database_url, catalog_tables, shard_tables
+import models  # noqa: F401 - registers tables on Base.metadata
+
+def _create_indexes(engine, tables, label):
+    """Create every declared index that doesn't exist yet."""
+    Base.metadata.create_all(bind=engine, tables=tables)  # also adds tables introduced since the last upgrade
+    for table in tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    print(f"✓ Indexes are up to date in {label}")
+
+def migrate():
+    database_url = _build_database_url()
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    main_tables = catalog_tables() if SHARD_DIR else Base.metadata.sorted_tables
+    _create_indexes(create_engine(database_url, connect_args=connect_args), main_tables, database_url)
+
+    if SHARD_DIR:
+        for path in sorted(glob.glob(os.path.join(SHARD_DIR, "*.db"))):
+            _create_indexes(create_engine(f"sqlite:///{path}"), shard_tables(), path)
+
+    print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    try:
+        migrate()
+    except Exception as e:
+        print(f"Error during migration: {e}", file=sys.stderr)
+        sys.exit(1)
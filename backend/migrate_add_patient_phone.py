@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the phone_normalized column to the patients table.
+Adds the column, fills it for existing patients and creates its index.
+Run this once to update existing database schema.
+"""
+from __future__ import annotations
+
+import glob
+import os
+import sys
+from sqlalchemy import create_engine, text
+from database import SHARD_DIR, _build_database_url
+from duplicates import normalize_phone
+
+BATCH_SIZE = 1000
+
+def _migrate(engine, label):
+    """Add and backfill phone_normalized in one database."""
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            result = conn.execute(text("PRAGMA table_info(patients)"))
+            columns = [row[1] for row in result.fetchall()]
+        else:
+            result = conn.execute(text("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_name='patients'
+            """))
+            columns = [row[0] for row in result.fetchall()]
+        if not columns:
+            print(f"✓ No patients table in {label}")
+            return
+
+        if "phone_normalized" not in columns:
+            print(f"Adding 'phone_normalized' column to patients table in {label}...")
+            conn.execute(text("ALTER TABLE patients ADD COLUMN phone_normalized VARCHAR(64) DEFAULT '' NOT NULL"))
+            conn.commit()
+
+        # Fill in batches so a large table never holds the write lock for long
+        fill = text("UPDATE patients SET phone_normalized = :normalized WHERE id = :id")
+        last_id = ""
+        filled = 0
+        while True:
+            rows = conn.execute(
+                text("SELECT id, phone FROM patients WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                {"last_id": last_id, "limit": BATCH_SIZE},
+            ).fetchall()
+            if not rows:
+                break
+            conn.execute(fill, [{"id": row[0], "normalized": normalize_phone(row[1])} for row in rows])
+            conn.commit()
+            filled += len(rows)
+            last_id = rows[-1][0]
+
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_patients_clinic_phone ON patients (clinic_id, phone_normalized)"
+        ))
+        conn.commit()
+        print(f"✓ 'phone_normalized' is up to date for {filled} patients in {label}")
+
+def migrate():
+    database_url = _build_database_url()
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    _migrate(create_engine(database_url, connect_args=connect_args), database_url)
+
+    if SHARD_DIR:
+        for path in sorted(glob.glob(os.path.join(SHARD_DIR, "*.db"))):
+            _migrate(create_engine(f"sqlite:///{path}"), path)
+
+    print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    try:
+        migrate()
+    except Exception as e:
+        print(f"Error during migration: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the series_id column to the visits and archived_visits tables.
+Run this once to update existing database schema.
+"""
+from __future__ import annotations
+
+import glob
+import os
+import sys
+from sqlalchemy import create_engine, text
+from database import SHARD_DIR, _build_database_url
+
+def _columns(conn, dialect, table):
+    if dialect == "sqlite":
+        return [row[1] for row in conn.execute(text(f"PRAGMA table_info({table})")).fetchall()]
+    result = conn.execute(
+        text("SELECT column_name FROM information_schema.columns WHERE table_name=:table"),
+        {"table": table},
+    )
+    return [row[0] for row in result.fetchall()]
+
+def _migrate(engine, label):
+    """Add series_id and its index in one database."""
+    with engine.connect() as conn:
+        for table in ("visits", "archived_visits"):
+            columns = _columns(conn, engine.dialect.name, table)
+            if not columns:
+                continue
+            if "series_id" not in columns:
+                print(f"Adding 'series_id' column to {table} table in {label}...")
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN series_id VARCHAR(64)"))
+                conn.commit()
+            else:
+                print(f"✓ 'series_id' column already exists in {table} table in {label}")
+
+        if _columns(conn, engine.dialect.name, "visits"):
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_visits_series_start ON visits (series_id, start_time) "
+                "WHERE series_id IS NOT NULL"
+            ))
+            conn.commit()
+
+def migrate():
+    database_url = _build_database_url()
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    _migrate(create_engine(database_url, connect_args=connect_args), database_url)
+
+    if SHARD_DIR:
+        for path in sorted(glob.glob(os.path.join(SHARD_DIR, "*.db"))):
+            _migrate(create_engine(f"sqlite:///{path}"), path)
+
+    print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    try:
+        migrate()
+    except Exception as e:
+        print(f"Error during migration: {e}", file=sys.stderr)
+        sys.exit(1)
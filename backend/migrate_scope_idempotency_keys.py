@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Migration script to scope batch idempotency keys to their clinic.
+The idempotency_keys table gets a (clinic_id, key) primary key and a request_hash column.
+Run this once to update existing database schema.
+"""
+from __future__ import annotations
+
+import glob
+import os
+import sys
+from sqlalchemy import create_engine, inspect, text
+from database import SHARD_DIR, Base, _build_database_url
+import models  # noqa: F401 - registers tables on Base.metadata
+
+def _migrate(engine, label):
+    """Recreate idempotency_keys in the new shape in one database."""
+    inspector = inspect(engine)
+    if "idempotency_keys" not in inspector.get_table_names():
+        print(f"✓ No idempotency_keys table in {label}")
+        return
+    if "request_hash" in [column["name"] for column in inspector.get_columns("idempotency_keys")]:
+        print(f"✓ idempotency_keys is already scoped to clinics in {label}")
+        return
+
+    # Stored keys can't be matched to a request hash; they only protect retries of recent
+    # batches, so they are dropped rather than converted.
+    with engine.connect() as conn:
+        dropped = conn.execute(text("SELECT COUNT(*) FROM idempotency_keys")).scalar_one()
+        conn.execute(text("DROP TABLE idempotency_keys"))
+        conn.commit()
+    Base.metadata.tables["idempotency_keys"].create(bind=engine)
+    print(f"✓ Recreated idempotency_keys in {label} ({dropped} old keys dropped)")
+
+def migrate():
+    database_url = _build_database_url()
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    _migrate(create_engine(database_url, connect_args=connect_args), database_url)
+
+    if SHARD_DIR:
+        for path in sorted(glob.glob(os.path.join(SHARD_DIR, "*.db"))):
+            _migrate(create_engine(f"sqlite:///{path}"), path)
+
+    print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    try:
+        migrate()
+    except Exception as e:
+        print(f"Error during migration: {e}", file=sys.stderr)
+        sys.exit(1)
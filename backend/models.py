@@ -9,9 +9,11 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     JSON,
     String,
     Text,
+    text,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -43,7 +45,7 @@ class User(Base):
     email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False, index=True)
     password: Mapped[Optional[str]] = mapped_column(String(255))
     phone: Mapped[Optional[str]] = mapped_column(String(64))
-    clinic_id: Mapped[str] = mapped_column(ForeignKey("clinics.id", ondelete="CASCADE"))
+    clinic_id: Mapped[str] = mapped_column(ForeignKey("clinics.id", ondelete="CASCADE"), index=True)
     proficiency: Mapped[Optional[str]] = mapped_column(String(255))
     role: Mapped[str] = mapped_column(String(32), default="user")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -61,7 +63,7 @@ class Doctor(Base):
     email: Mapped[Optional[str]] = mapped_column(String(255), index=True)
     phone: Mapped[Optional[str]] = mapped_column(String(64))
     color: Mapped[str] = mapped_column(String(32), nullable=False)
-    clinic_id: Mapped[str] = mapped_column(ForeignKey("clinics.id", ondelete="CASCADE"))
+    clinic_id: Mapped[str] = mapped_column(ForeignKey("clinics.id", ondelete="CASCADE"), index=True)
     user_id: Mapped[Optional[str]] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"))
 
     clinic: Mapped[Clinic] = relationship("Clinic", back_populates="doctors")
@@ -75,17 +77,23 @@ class Service(Base):
     id: Mapped[str] = mapped_column(String(64), primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     default_price: Mapped[float] = mapped_column(Float, default=0, nullable=False)
-    clinic_id: Mapped[str] = mapped_column(ForeignKey("clinics.id", ondelete="CASCADE"))
+    clinic_id: Mapped[str] = mapped_column(ForeignKey("clinics.id", ondelete="CASCADE"), index=True)
 
     clinic: Mapped[Clinic] = relationship("Clinic", back_populates="services")
 
 
 class Patient(Base):
     __tablename__ = "patients"
+    __table_args__ = (
+        Index("ix_patients_clinic_created", "clinic_id", "created_at"),
+        Index("ix_patients_clinic_phone", "clinic_id", "phone_normalized"),
+    )
 
     id: Mapped[str] = mapped_column(String(64), primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     phone: Mapped[str] = mapped_column(String(64), nullable=False)
+    # Digits-only form of ``phone`` (see duplicates.normalize_phone), used for lookups
+    phone_normalized: Mapped[str] = mapped_column(String(64), nullable=False, default="", server_default="")
     email: Mapped[str] = mapped_column(String(255), nullable=False, server_default="")
     date_of_birth: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
     is_child: Mapped[bool] = mapped_column(Boolean, default=False)
@@ -106,6 +114,20 @@ class Patient(Base):
 
 class Visit(Base):
     __tablename__ = "visits"
+    __table_args__ = (
+        Index("ix_visits_clinic_start", "clinic_id", "start_time"),
+        Index("ix_visits_doctor_start", "doctor_id", "start_time"),
+        Index("ix_visits_patient", "patient_id"),
+        # Partial: most visits aren't part of a series, and all-NULL entries would make the
+        # planner think the index is useless
+        Index(
+            "ix_visits_series_start",
+            "series_id",
+            "start_time",
+            sqlite_where=text("series_id IS NOT NULL"),
+            postgresql_where=text("series_id IS NOT NULL"),
+        ),
+    )
 
     id: Mapped[str] = mapped_column(String(64), primary_key=True, index=True)
     patient_id: Mapped[str] = mapped_column(ForeignKey("patients.id", ondelete="CASCADE"))
@@ -124,6 +146,8 @@ class Visit(Base):
     treated_teeth: Mapped[list] = mapped_column(JSON, default=list)
     cash_amount: Mapped[float] = mapped_column(Float, default=0)
     ewallet_amount: Mapped[float] = mapped_column(Float, default=0)
+    # Set on visits booked together as a recurring series (see series.py)
+    series_id: Mapped[Optional[str]] = mapped_column(String(64))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -135,6 +159,7 @@ class Visit(Base):
 
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (Index("ix_payments_visit", "visit_id"),)
 
     id: Mapped[str] = mapped_column(String(64), primary_key=True, index=True)
     visit_id: Mapped[str] = mapped_column(ForeignKey("visits.id", ondelete="CASCADE"))
@@ -147,6 +172,10 @@ class Payment(Base):
 
 class PatientFile(Base):
     __tablename__ = "patient_files"
+    __table_args__ = (
+        Index("ix_patient_files_patient_uploaded", "patient_id", "uploaded_at"),
+        Index("ix_patient_files_clinic_uploaded", "clinic_id", "uploaded_at"),
+    )
 
     id: Mapped[str] = mapped_column(String(64), primary_key=True, index=True)
     patient_id: Mapped[str] = mapped_column(ForeignKey("patients.id", ondelete="CASCADE"))
@@ -157,3 +186,75 @@ class PatientFile(Base):
 
     patient: Mapped[Patient] = relationship("Patient", back_populates="files")
     clinic: Mapped[Clinic] = relationship("Clinic", back_populates="files")
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # Keys are chosen by clients, so the same key may be used by different clinics
+    clinic_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    key: Mapped[str] = mapped_column(String(128), primary_key=True)
+    # SHA-256 of the operations, to tell a retry from a different batch reusing the key
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    response: Mapped[dict] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+
+class AuditLog(Base):
+    __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index("ix_audit_logs_entity", "entity", "entity_id", "created_at"),
+        Index("ix_audit_logs_clinic", "clinic_id", "created_at"),
+    )
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    clinic_id: Mapped[Optional[str]] = mapped_column(String(64))
+    entity: Mapped[str] = mapped_column(String(64), nullable=False)
+    entity_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    action: Mapped[str] = mapped_column(String(16), nullable=False)
+    changes: Mapped[dict] = mapped_column(JSON, default=dict)
+    user_id: Mapped[Optional[str]] = mapped_column(String(64))
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Archive ---------------------------------------------------------------------
+# Cold copies of completed/cancelled visits and their payments. They carry no
+# foreign keys so that archived history survives edits to the hot tables.
+
+
+class ArchivedVisit(Base):
+    __tablename__ = "archived_visits"
+    __table_args__ = (
+        Index("ix_archived_visits_clinic_start", "clinic_id", "start_time"),
+        Index("ix_archived_visits_patient", "patient_id"),
+    )
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    patient_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    doctor_id: Mapped[Optional[str]] = mapped_column(String(64))
+    clinic_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    start_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    end_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    services: Mapped[list] = mapped_column(JSON, default=list)
+    cost: Mapped[float] = mapped_column(Float, default=0)
+    notes: Mapped[Optional[str]] = mapped_column(Text)
+    status: Mapped[str] = mapped_column(String(32), nullable=False)
+    treated_teeth: Mapped[list] = mapped_column(JSON, default=list)
+    cash_amount: Mapped[float] = mapped_column(Float, default=0)
+    ewallet_amount: Mapped[float] = mapped_column(Float, default=0)
+    series_id: Mapped[Optional[str]] = mapped_column(String(64))
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+    updated_at: Mapped[datetime] = mapped_column(DateTime)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ArchivedPayment(Base):
+    __tablename__ = "archived_payments"
+    __table_args__ = (Index("ix_archived_payments_visit", "visit_id"),)
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    visit_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    amount: Mapped[float] = mapped_column(Float, nullable=False)
+    date: Mapped[datetime] = mapped_column(DateTime)
+    method: Mapped[Optional[str]] = mapped_column(String(32))
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
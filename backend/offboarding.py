@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import and_, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from database import SHARD_DIR, open_session, shard_engines, shard_path
+import audit
+import models
+import schemas
+
+OFFBOARDING_BATCH_SIZE = int(os.getenv("SERKOR_OFFBOARDING_BATCH_SIZE", "500"))
+OFFBOARDING_BATCH_SLEEP = 0.01  # lets request handlers take the write lock between batches
+JOBS_KEPT = 100
+
+logger = logging.getLogger("serkor.offboarding")
+
+
+class JobConflict(Exception):
+    pass
+
+
+class OffboardingJob:
+    """Progress of one offboarding run; ``progress`` and ``totals`` count rows per step."""
+
+    def __init__(self, kind: str, clinic_id: str, target_id: str) -> None:
+        self.id = schemas.create_id("job")
+        self.kind = kind
+        self.clinic_id = clinic_id
+        self.target_id = target_id
+        self.status = "queued"
+        self.progress: Dict[str, int] = {}
+        self.totals: Dict[str, int] = {}
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def advance(self, step: str, rows: int) -> None:
+        self.progress[step] = self.progress.get(step, 0) + rows
+
+
+def _in_batches(db: Session, job: OffboardingJob, step: str, ids_stmt, apply: Callable[[List[str]], None]) -> None:
+    """Select up to ``OFFBOARDING_BATCH_SIZE`` ids, apply a set-based change to them and commit, until none are left.
+
+    ``apply`` must make the rows stop matching ``ids_stmt``, otherwise this never ends.
+    """
+    job.advance(step, 0)
+    while True:
+        ids = db.execute(ids_stmt.limit(OFFBOARDING_BATCH_SIZE)).scalars().all()
+        if not ids:
+            return
+        apply(ids)
+        db.commit()
+        job.advance(step, len(ids))
+        time.sleep(OFFBOARDING_BATCH_SLEEP)
+
+
+def _delete_ids(db: Session, model, ids: List[str]) -> None:
+    db.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+
+
+def _count(db: Session, key, where) -> int:
+    return db.execute(select(func.count(key)).where(where)).scalar_one()
+
+
+def offboard_doctor(job: OffboardingJob, reassign_to: Optional[str], since: datetime) -> None:
+    """Hand a doctor's upcoming visits to ``reassign_to``, detach the rest and delete the doctor.
+
+    Upcoming means scheduled at or after ``since``; with no ``reassign_to`` they become
+    unassigned. Older visits keep their history but lose the doctor, like ``ON DELETE SET NULL``.
+    """
+    doctor_id = job.target_id
+    upcoming = and_(
+        models.Visit.doctor_id == doctor_id,
+        models.Visit.status == "scheduled",
+        models.Visit.start_time >= since,
+    )
+    remaining = models.Visit.doctor_id == doctor_id
+
+    db = open_session(job.clinic_id)
+    try:
+        job.totals = {"reassignedVisits": _count(db, models.Visit.id, upcoming)}
+        job.totals["detachedVisits"] = _count(db, models.Visit.id, remaining) - job.totals["reassignedVisits"]
+
+        def reassign(ids: List[str], doctor: Optional[str]) -> None:
+            db.execute(
+                update(models.Visit)
+                .where(models.Visit.id.in_(ids))
+                .values(doctor_id=doctor, updated_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+
+        visit_ids = select(models.Visit.id)
+        _in_batches(db, job, "reassignedVisits", visit_ids.where(upcoming), lambda ids: reassign(ids, reassign_to))
+        _in_batches(db, job, "detachedVisits", visit_ids.where(remaining), lambda ids: reassign(ids, None))
+
+        _delete_ids(db, models.Doctor, [doctor_id])
+        audit.record(
+            db,
+            "doctors",
+            doctor_id,
+            job.clinic_id,
+            "delete",
+            {"reassignedTo": {"before": doctor_id, "after": reassign_to}, **audit.diff({}, job.progress)},
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def purge_clinic(job: OffboardingJob) -> None:
+    """Delete a clinic and everything it owns, child tables first, one batch per transaction."""
+    clinic_id = job.clinic_id
+    # step, model, key column, rows to delete, (foreign key, child model) deleted along with each batch
+    steps = [
+        (
+            "visits",
+            models.Visit,
+            models.Visit.id,
+            models.Visit.clinic_id == clinic_id,
+            (models.Payment.visit_id, models.Payment),
+        ),
+        (
+            "archivedVisits",
+            models.ArchivedVisit,
+            models.ArchivedVisit.id,
+            models.ArchivedVisit.clinic_id == clinic_id,
+            (models.ArchivedPayment.visit_id, models.ArchivedPayment),
+        ),
+        ("files", models.PatientFile, models.PatientFile.id, models.PatientFile.clinic_id == clinic_id, None),
+        ("patients", models.Patient, models.Patient.id, models.Patient.clinic_id == clinic_id, None),
+        ("services", models.Service, models.Service.id, models.Service.clinic_id == clinic_id, None),
+        ("doctors", models.Doctor, models.Doctor.id, models.Doctor.clinic_id == clinic_id, None),
+        ("auditLogs", models.AuditLog, models.AuditLog.id, models.AuditLog.clinic_id == clinic_id, None),
+        (
+            "idempotencyKeys",
+            models.IdempotencyKey,
+            models.IdempotencyKey.key,
+            models.IdempotencyKey.clinic_id == clinic_id,
+            None,
+        ),
+        ("users", models.User, models.User.id, models.User.clinic_id == clinic_id, None),
+    ]
+
+    # Write queued audit entries now so they are purged too instead of landing afterwards
+    audit.writer.flush()
+    db = open_session(clinic_id)
+    try:
+        job.totals = {step: _count(db, key, where) for step, _model, key, where, _children in steps}
+        for step, model, key, where, children in steps:
+
+            def apply(ids: List[str], model=model, key=key, where=where, children=children) -> None:
+                if children is not None:
+                    column, child = children
+                    db.execute(delete(child).where(column.in_(ids)).execution_options(synchronize_session=False))
+                # ``where`` too: idempotency keys are only unique together with the clinic
+                db.execute(delete(model).where(where, key.in_(ids)).execution_options(synchronize_session=False))
+
+            _in_batches(db, job, step, select(key).where(where), apply)
+
+        _delete_ids(db, models.Clinic, [clinic_id])
+        if not SHARD_DIR:
+            # The clinic's own audit trail is gone; keep a record of the purge itself
+            audit.record(db, "clinics", clinic_id, None, "delete", audit.diff({}, job.progress))
+        db.commit()
+    finally:
+        db.close()
+    logger.info("Purged clinic %s: %s", clinic_id, job.progress)
+
+    if SHARD_DIR:
+        shard_engines.discard(clinic_id)
+        if os.path.exists(shard_path(clinic_id)):
+            os.remove(shard_path(clinic_id))
+
+
+class JobRunner:
+    """Runs offboarding jobs one at a time on a background thread and keeps the latest ``JOBS_KEPT``."""
+
+    def __init__(self) -> None:
+        self._jobs: "OrderedDict[str, OffboardingJob]" = OrderedDict()
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="serkor-offboarding", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def submit(self, job: OffboardingJob, work: Callable[[], None]) -> OffboardingJob:
+        with self._lock:
+            for other in self._jobs.values():
+                if other.active and (other.kind, other.target_id) == (job.kind, job.target_id):
+                    raise JobConflict(other.id)
+            self._jobs[job.id] = job
+            while len(self._jobs) > JOBS_KEPT:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.active:
+                    break
+                self._jobs.popitem(last=False)
+        self.start()
+        self._queue.put((job, work))
+        return job
+
+    def get(self, job_id: str) -> Optional[OffboardingJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[OffboardingJob]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            job, work = item
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            try:
+                work()
+                job.status = "completed"
+            except Exception as exc:  # surfaced through the job; rerunning picks up where it stopped
+                logger.exception("Offboarding job %s failed", job.id)
+                job.status = "failed"
+                job.error = str(exc)
+            job.finished_at = datetime.utcnow()
+
+
+runner = JobRunner()
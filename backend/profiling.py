@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import glob
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.middleware.base import BaseHTTPMiddleware
+
+PROFILE_DIR = os.path.abspath(
+    os.getenv("SERKOR_PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"))
+)
+PROFILE_SAMPLE_RATE = float(os.getenv("SERKOR_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_KEEP = int(os.getenv("SERKOR_PROFILE_KEEP", "200"))
+PROFILE_TOP_FUNCTIONS = 40
+
+PROFILE_HEADER = "x-profile"
+_MODES = ("save", "attach")
+_SLUG = re.compile(r"[^a-zA-Z0-9]+")
+
+logger = logging.getLogger("serkor.profiling")
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    """cProfile data and timed SQL statements collected for a single request."""
+
+    def __init__(self, request: Request, reason: str) -> None:
+        self.started_at = datetime.utcnow()
+        self.id = "-".join(
+            [self.started_at.strftime("%Y%m%dT%H%M%S%f"), request.method, _SLUG.sub("_", request.url.path).strip("_")]
+        )
+        self.method = request.method
+        self.path = request.url.path
+        self.query = request.url.query
+        self.clinic_id = request.headers.get("x-clinic-id") or request.query_params.get("clinicId")
+        self.reason = reason
+        self.profiler = cProfile.Profile()
+        self.statements: List[Dict[str, Any]] = []
+        self._started = time.perf_counter()
+
+    def record_statement(self, statement: str, seconds: float, executemany: bool) -> None:
+        self.statements.append(
+            {"statement": " ".join(statement.split()), "ms": round(seconds * 1000, 3), "executemany": executemany}
+        )
+
+    def _functions(self) -> str:
+        out = io.StringIO()
+        try:
+            stats = pstats.Stats(self.profiler, stream=out)
+        except TypeError:  # the handler never ran, e.g. a 404 or a validation error
+            return ""
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        return out.getvalue()
+
+    def report(self, status_code: int) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "reason": self.reason,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "clinicId": self.clinic_id,
+            "status": status_code,
+            "startedAt": self.started_at.isoformat(),
+            "durationMs": round((time.perf_counter() - self._started) * 1000, 3),
+            "sql": {
+                "count": len(self.statements),
+                "totalMs": round(sum(item["ms"] for item in self.statements), 3),
+                "statements": self.statements,
+            },
+            "profile": self._functions(),
+        }
+
+    def save(self, status_code: int) -> None:
+        """Write ``<id>.json`` (the report) and ``<id>.prof`` (raw stats for pstats/snakeviz)."""
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        report = self.report(status_code)
+        self.profiler.dump_stats(os.path.join(PROFILE_DIR, f"{self.id}.prof"))
+        with open(os.path.join(PROFILE_DIR, f"{self.id}.json"), "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        _apply_retention()
+
+
+def _apply_retention() -> None:
+    for path in sorted(glob.glob(os.path.join(PROFILE_DIR, "*.json")), reverse=True)[PROFILE_KEEP:]:
+        for stale in (path, path[: -len(".json")] + ".prof"):
+            if os.path.exists(stale):
+                os.remove(stale)
+
+
+def list_profiles() -> List[Dict[str, object]]:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    return [
+        {
+            "file": os.path.basename(path),
+            "size": os.path.getsize(path),
+            "createdAt": datetime.utcfromtimestamp(os.path.getmtime(path)).isoformat(),
+        }
+        for path in sorted(glob.glob(os.path.join(PROFILE_DIR, "*.json")), reverse=True)
+    ]
+
+
+def profile_path(file_name: str) -> str:
+    path = os.path.join(PROFILE_DIR, os.path.basename(file_name))
+    if not path.endswith((".json", ".prof")) or not os.path.isfile(path):
+        raise FileNotFoundError(file_name)
+    return path
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement(_conn, _cursor, _statement, _parameters, context, _executemany) -> None:
+    if current_profile.get() is not None:
+        context._profile_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _finish_statement(_conn, _cursor, statement, _parameters, context, executemany) -> None:
+    profile = current_profile.get()
+    started = getattr(context, "_profile_started", None)
+    if profile is not None and started is not None:
+        profile.record_statement(statement, time.perf_counter() - started, executemany)
+
+
+def _profiled(call):
+    # Sync endpoints run in a worker thread and cProfile only sees the thread it is enabled
+    # in, so the profiler is switched on inside the call rather than in the middleware.
+    @wraps(call)
+    def run(*args, **kwargs):
+        profile = current_profile.get()
+        if profile is None:
+            return call(*args, **kwargs)
+        return profile.profiler.runcall(call, *args, **kwargs)
+
+    return run
+
+
+class ProfiledRoute(APIRoute):
+    """Route class that lets :class:`ProfilingMiddleware` profile the endpoint function."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # The request handler reads ``dependant.call`` on every request; wrapping it there keeps
+        # the signature FastAPI already resolved from the original function.
+        if self.dependant.call is not None and not asyncio.iscoroutinefunction(self.dependant.call):
+            self.dependant.call = _profiled(self.dependant.call)
+
+
+def _requested_mode(request: Request) -> Optional[str]:
+    value = request.headers.get(PROFILE_HEADER)
+    if value is None:
+        return None
+    return value.strip().lower() if value.strip().lower() in _MODES else "save"
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """Profiles requests that ask for it with ``X-Profile`` plus a sample of all other requests.
+
+    ``X-Profile: attach`` returns the report instead of the normal response; any other value
+    saves it to ``PROFILE_DIR``. Explicit requests need the admin token.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        mode = _requested_mode(request)
+        if mode is not None:
+            expected = os.getenv("SERKOR_ADMIN_TOKEN")
+            if not expected or request.headers.get("x-admin-token") != expected:
+                return JSONResponse(status_code=403, content={"detail": "Profiling requires a valid admin token"})
+            reason = "requested"
+        elif PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+            mode, reason = "save", "sampled"
+        else:
+            return await call_next(request)
+
+        profile = RequestProfile(request, reason)
+        token = current_profile.set(profile)
+        try:
+            response = await call_next(request)
+        finally:
+            current_profile.reset(token)
+
+        if mode == "attach":
+            # Drain the body so streamed responses finish their queries before the report is built
+            async for _chunk in response.body_iterator:
+                pass
+            return JSONResponse(
+                content=profile.report(response.status_code),
+                headers={"Content-Disposition": f'attachment; filename="{profile.id}.json"'},
+            )
+
+        body = response.body_iterator
+
+        async def save_after_body():
+            try:
+                async for chunk in body:
+                    yield chunk
+            finally:
+                try:
+                    await asyncio.to_thread(profile.save, response.status_code)
+                except OSError:
+                    logger.exception("Failed to save profile %s", profile.id)
+
+        response.body_iterator = save_after_body()
+        response.headers["X-Profile-Id"] = profile.id
+        return response
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import Select, select
+
+import models
+from schemas import to_camel
+
+
+def _column_fields(model) -> Dict[str, str]:
+    return {to_camel(column.key): column.key for column in model.__table__.columns}
+
+
+VISIT_FIELDS = {**_column_fields(models.Visit), "patientName": None}
+PATIENT_FIELDS = _column_fields(models.Patient)
+
+VISIT_VIEWS = {
+    "calendar": ["id", "patientId", "patientName", "doctorId", "startTime", "endTime", "status", "seriesId"],
+}
+PATIENT_VIEWS = {
+    "compact": ["id", "name", "phone", "dateOfBirth", "status", "balance"],
+}
+
+# Hidden column used to merge hot and archived visits in start_time order
+SORT_KEY = "_sortKey"
+
+
+def parse_fields(
+    fields: Optional[str],
+    view: Optional[str],
+    available: Dict[str, Optional[str]],
+    views: Dict[str, List[str]],
+) -> Optional[List[str]]:
+    """Resolve ``fields=a,b`` and ``view=name`` into response keys; ``None`` means full entities."""
+    if not fields and not view:
+        return None
+    names: List[str] = []
+    if view:
+        if view not in views:
+            raise HTTPException(status_code=400, detail=f"Unknown view '{view}'. Available: {', '.join(views)}")
+        names.extend(views[view])
+    if fields:
+        names.extend(name.strip() for name in fields.split(",") if name.strip())
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(["id", *names]))
+
+
+def visit_columns_stmt(model, names: List[str], clinic_id: Optional[str]) -> Select:
+    """Column-only select of ``names`` from ``Visit`` or ``ArchivedVisit``, newest first."""
+    columns = []
+    for name in names:
+        if name == "patientName":
+            columns.append(models.Patient.name.label(name))
+        else:
+            columns.append(getattr(model, VISIT_FIELDS[name]).label(name))
+    stmt = select(*columns, model.start_time.label(SORT_KEY))
+    if "patientName" in names:
+        stmt = stmt.outerjoin(models.Patient, models.Patient.id == model.patient_id)
+    if clinic_id:
+        stmt = stmt.where(model.clinic_id == clinic_id)
+    return stmt.order_by(model.start_time.desc())
+
+
+def patient_columns_stmt(names: List[str], clinic_id: Optional[str]) -> Select:
+    stmt = select(*[getattr(models.Patient, PATIENT_FIELDS[name]).label(name) for name in names])
+    if clinic_id:
+        stmt = stmt.where(models.Patient.clinic_id == clinic_id)
+    return stmt.order_by(models.Patient.created_at.desc())
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import List, Optional, Union
-from uuid import uuid4
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Literal, Optional, Union
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from pydantic.config import ConfigDict
 
 
@@ -13,8 +15,42 @@ def to_camel(string: str) -> str:
     return parts[0] + "".join(word.capitalize() for word in parts[1:])
 
 
+# Lowercase Crockford base32: digits sort before letters, so encoded ids sort like the numbers
+_ID_ALPHABET = "0123456789abcdefghjkmnpqrstvwxyz"
+_ID_RANDOM_BITS = 80
+_id_lock = threading.Lock()
+_last_id_ms = 0
+_last_id_random = 0
+
+
+def _encode_id(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(_ID_ALPHABET[index])
+    return "".join(reversed(chars))
+
+
 def create_id(prefix: str) -> str:
-    return f"{prefix}_{uuid4().hex[:12]}"
+    """Return ``prefix_`` plus a 26-character ULID-style id that sorts by creation time.
+
+    The first 10 characters are the millisecond timestamp and the last 16 are random.
+    Ids created in the same millisecond increment the random part, so ids from one
+    process are strictly increasing. Older ``prefix_<12 hex>`` ids remain valid.
+    """
+    global _last_id_ms, _last_id_random
+    with _id_lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_id_ms:
+            _last_id_ms = now_ms
+            _last_id_random = int.from_bytes(os.urandom(10), "big")
+        else:
+            _last_id_random += 1
+            if _last_id_random >> _ID_RANDOM_BITS:
+                _last_id_ms += 1
+                _last_id_random = int.from_bytes(os.urandom(10), "big")
+        value = (_last_id_ms << _ID_RANDOM_BITS) | _last_id_random
+    return f"{prefix}_{_encode_id(value, 26)}"
 
 
 class ORMModel(BaseModel):
@@ -123,6 +159,28 @@ class PatientPayload(BaseModel):
     updatedAt: Optional[datetime] = None
 
 
+class PatientPatch(BaseModel):
+    """JSON merge patch for a patient: only supplied fields change, ``null`` clears a field.
+
+    ``teeth`` replaces the whole chart when given as a list, or merges per tooth when
+    given as ``{"<toothNumber>": "<status>" | null}``.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, extra="forbid")
+
+    name: Optional[str] = None
+    phone: Optional[str] = None
+    email: Optional[str] = None
+    dateOfBirth: Optional[datetime] = None
+    isChild: Optional[bool] = None
+    address: Optional[str] = None
+    notes: Optional[str] = None
+    status: Optional[str] = None
+    teeth: Optional[Union[List[ToothStatus], Dict[int, Optional[str]]]] = None
+    services: Optional[List[str]] = None
+    balance: Optional[float] = None
+
+
 class PatientResponse(ORMModel):
     id: str
     name: str
@@ -166,6 +224,22 @@ class VisitPayload(BaseModel):
     createdAt: Optional[datetime] = None
 
 
+class VisitPatch(BaseModel):
+    """JSON merge patch for a visit: only supplied fields change, ``null`` clears a field."""
+
+    model_config = ConfigDict(populate_by_name=True, extra="forbid")
+
+    patientId: Optional[str] = None
+    doctorId: Optional[str] = None
+    startTime: Optional[datetime] = None
+    endTime: Optional[datetime] = None
+    services: Optional[List[Union[str, VisitServicePayload]]] = None
+    cost: Optional[float] = None
+    notes: Optional[str] = None
+    status: Optional[str] = None
+    treatedTeeth: Optional[List[int]] = None
+
+
 class VisitResponse(ORMModel):
     id: str
     patient_id: str
@@ -180,10 +254,80 @@ class VisitResponse(ORMModel):
     treated_teeth: list
     cash_amount: float
     ewallet_amount: float
+    series_id: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
 
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Visit times are stored as naive UTC; series code compares them with what it receives
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class SeriesRecurrence(BaseModel):
+    frequency: Literal["daily", "weekly", "monthly"]
+    interval: int = Field(1, ge=1)
+    count: Optional[int] = Field(None, ge=1)
+    until: Optional[datetime] = None
+    # Weekly series only: days of the week to book, 0 = Monday
+    weekdays: Optional[List[int]] = Field(None, min_length=1)
+
+    @field_validator("weekdays")
+    @classmethod
+    def _check_weekdays(cls, value: Optional[List[int]]) -> Optional[List[int]]:
+        if value is not None and any(day < 0 or day > 6 for day in value):
+            raise ValueError("weekdays must be between 0 (Monday) and 6 (Sunday)")
+        return value
+
+    _until_utc = field_validator("until")(_naive_utc)
+
+
+class VisitSeriesPayload(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    patientId: str
+    doctorId: Optional[str] = None
+    clinicId: str
+    startTime: datetime
+    endTime: datetime
+    services: List[Union[str, VisitServicePayload]] = Field(default_factory=list)
+    cost: float = 0
+    notes: Optional[str] = None
+    recurrence: SeriesRecurrence
+    # Book the free dates and report the rest instead of rejecting the whole series
+    skipConflicts: bool = False
+
+    _times_utc = field_validator("startTime", "endTime")(_naive_utc)
+
+
+class VisitSeriesPatch(BaseModel):
+    """Change every scheduled visit of a series from ``fromTime`` on (default: now)."""
+
+    model_config = ConfigDict(populate_by_name=True, extra="forbid")
+
+    fromTime: Optional[datetime] = None
+    doctorId: Optional[str] = None
+    notes: Optional[str] = None
+    status: Optional[Literal["scheduled", "cancelled"]] = None
+    shiftMinutes: Optional[int] = None
+
+    _from_time_utc = field_validator("fromTime")(_naive_utc)
+
+
+class VisitConflict(BaseModel):
+    startTime: datetime
+    endTime: datetime
+    visitId: str
+
+
+class VisitSeriesResponse(BaseModel):
+    seriesId: str
+    visits: List[VisitResponse]
+    conflicts: List[VisitConflict] = Field(default_factory=list)
+
+
 class PaymentPayload(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
 
@@ -221,3 +365,96 @@ class PatientFileResponse(ORMModel):
     file_url: str
     uploaded_at: datetime
 
+
+class DuplicatePatient(ORMModel):
+    id: str
+    name: str
+    phone: str
+    date_of_birth: datetime
+    created_at: Optional[datetime]
+
+
+class DuplicateCluster(BaseModel):
+    patients: List[DuplicatePatient]
+    reasons: List[str]
+
+
+class PatientMergePayload(BaseModel):
+    clinicId: str
+    targetId: str
+    sourceIds: List[str] = Field(min_length=1)
+
+
+class PatientMergeResponse(BaseModel):
+    patient: PatientResponse
+    merged: List[str]
+    visits: int
+    archivedVisits: int
+    files: int
+
+
+class DoctorOffboardingPayload(BaseModel):
+    clinicId: str
+    doctorId: str
+    reassignTo: Optional[str] = None
+    since: Optional[datetime] = None
+
+
+class ClinicPurgePayload(BaseModel):
+    clinicId: str
+
+
+class OffboardingJobResponse(ORMModel):
+    id: str
+    kind: str
+    clinic_id: str
+    target_id: str
+    status: str
+    progress: Dict[str, int]
+    totals: Dict[str, int]
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+
+class AuditLogResponse(ORMModel):
+    id: str
+    clinic_id: Optional[str]
+    entity: str
+    entity_id: str
+    action: str
+    changes: Dict[str, Any]
+    user_id: Optional[str]
+    created_at: datetime
+
+
+class BatchOperation(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    op: Literal["upsert", "delete"]
+    resource: Literal["users", "doctors", "services", "patients", "visits", "payments", "files"]
+    data: Optional[Dict[str, Any]] = None
+    id: Optional[str] = None
+    clinicId: Optional[str] = None
+
+
+class BatchPayload(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    clinicId: Optional[str] = None
+    idempotencyKey: Optional[str] = Field(default=None, max_length=128)
+    operations: List[BatchOperation] = Field(min_length=1, max_length=200)
+
+
+class BatchResult(BaseModel):
+    op: str
+    resource: str
+    id: str
+    result: Optional[Dict[str, Any]] = None
+
+
+class BatchResponse(BaseModel):
+    idempotencyKey: Optional[str] = None
+    replayed: bool = False
+    results: List[BatchResult]
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import calendar
+import os
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+
+MAX_SERIES_OCCURRENCES = int(os.getenv("SERKOR_SERIES_MAX_OCCURRENCES", "200"))
+
+Slot = Tuple[datetime, datetime]
+
+
+def _add_months(moment: datetime, months: int) -> datetime:
+    year, month = divmod(moment.month - 1 + months, 12)
+    year += moment.year
+    day = min(moment.day, calendar.monthrange(year, month + 1)[1])
+    return moment.replace(year=year, month=month + 1, day=day)
+
+
+def _candidates(rule: schemas.SeriesRecurrence, start: datetime) -> Iterator[datetime]:
+    if rule.frequency == "weekly" and rule.weekdays:
+        week_start = start - timedelta(days=start.weekday())
+        weekdays = sorted(set(rule.weekdays))
+        week = 0
+        while True:
+            for weekday in weekdays:
+                moment = week_start + timedelta(weeks=week * rule.interval, days=weekday)
+                if moment >= start:
+                    yield moment
+            week += 1
+
+    step = 0
+    while True:
+        if rule.frequency == "monthly":
+            # Always count from the first visit so the 31st stays the 31st where the month has one
+            yield _add_months(start, step * rule.interval)
+        elif rule.frequency == "weekly":
+            yield start + timedelta(weeks=step * rule.interval)
+        else:
+            yield start + timedelta(days=step * rule.interval)
+        step += 1
+
+
+def occurrences(rule: schemas.SeriesRecurrence, start: datetime) -> List[datetime]:
+    """Start times of every visit in a series, from ``start`` on."""
+    if rule.count is None and rule.until is None:
+        raise ValueError("Recurrence needs count or until")
+    starts: List[datetime] = []
+    for moment in _candidates(rule, start):
+        if (rule.count is not None and len(starts) >= rule.count) or (rule.until is not None and moment > rule.until):
+            break
+        if len(starts) >= MAX_SERIES_OCCURRENCES:
+            raise ValueError(f"A series can have at most {MAX_SERIES_OCCURRENCES} visits")
+        starts.append(moment)
+    if not starts:
+        raise ValueError("Recurrence has no visits between startTime and until")
+    return starts
+
+
+def find_conflicts(
+    db: Session,
+    doctor_id: Optional[str],
+    slots: List[Slot],
+    exclude_ids: Iterable[str] = (),
+) -> List[Tuple[int, str]]:
+    """Return ``(slot index, visit id)`` for every slot that overlaps one of the doctor's visits.
+
+    All slots are checked against a single range query over the doctor's visits between the
+    first and the last slot; cancelled visits don't block a slot.
+    """
+    if not doctor_id or not slots:
+        return []
+    stmt = (
+        select(models.Visit.id, models.Visit.start_time, models.Visit.end_time)
+        .where(
+            models.Visit.doctor_id == doctor_id,
+            models.Visit.start_time < max(end for _start, end in slots),
+            models.Visit.end_time > min(start for start, _end in slots),
+            models.Visit.status != "cancelled",
+        )
+        .order_by(models.Visit.start_time)
+    )
+    exclude_ids = list(exclude_ids)
+    if exclude_ids:
+        stmt = stmt.where(models.Visit.id.not_in(exclude_ids))
+    booked = db.execute(stmt).all()
+    if not booked:
+        return []
+
+    starts = [row.start_time for row in booked]
+    longest = max(row.end_time - row.start_time for row in booked)
+    conflicts = []
+    for index, (start, end) in enumerate(slots):
+        # Only visits starting before the slot ends, and not so early that they must be over, can overlap
+        position = bisect_left(starts, end) - 1
+        while position >= 0 and starts[position] > start - longest:
+            if booked[position].end_time > start:
+                conflicts.append((index, booked[position].id))
+                break
+            position -= 1
+    return conflicts
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Split a single-file database into one SQLite shard per clinic.
+
+Usage:
+    SERKOR_SHARD_DIR=backend/shards python3 split_shards.py
+
+The source database (SERKOR_DB_PATH / SERKOR_DB_URL) is left untouched and keeps
+serving as the catalog for clinics and users once sharded mode is enabled.
+"""
+from __future__ import annotations
+
+import sys
+
+from sqlalchemy import create_engine, select
+
+from database import SHARD_DIR, Base, _build_database_url, shard_path, shard_tables
+import models  # noqa: F401 - registers tables on Base.metadata
+
+CHUNK_SIZE = 1000
+
+# Tables without a clinic_id column, scoped through their parent visit.
+_VISIT_CHILDREN = {
+    "payments": models.Visit.__table__,
+    "archived_payments": models.ArchivedVisit.__table__,
+}
+
+
+def _clinic_filter(table, clinic_id: str):
+    if "clinic_id" in table.c:
+        return table.c.clinic_id == clinic_id
+    parent = _VISIT_CHILDREN.get(table.name)
+    if parent is None:
+        raise RuntimeError(f"Don't know how to shard table {table.name!r}")
+    return table.c.visit_id.in_(select(parent.c.id).where(parent.c.clinic_id == clinic_id))
+
+
+def split():
+    """Copy every clinic's rows into its own shard file."""
+    if not SHARD_DIR:
+        raise RuntimeError("Set SERKOR_SHARD_DIR to the directory that should hold the shards")
+
+    database_url = _build_database_url()
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    source = create_engine(database_url, connect_args=connect_args)
+    tables = shard_tables()
+
+    with source.connect() as src:
+        clinic_ids = src.execute(select(models.Clinic.__table__.c.id)).scalars().all()
+        for clinic_id in clinic_ids:
+            target = create_engine(f"sqlite:///{shard_path(clinic_id)}")
+            Base.metadata.create_all(bind=target, tables=tables)
+            copied = 0
+            with target.begin() as dst:
+                for table in tables:
+                    result = src.execute(select(table).where(_clinic_filter(table, clinic_id)))
+                    while rows := result.mappings().fetchmany(CHUNK_SIZE):
+                        dst.execute(table.insert().prefix_with("OR IGNORE"), [dict(row) for row in rows])
+                        copied += len(rows)
+            target.dispose()
+            print(f"✓ {clinic_id}: {copied} rows -> {shard_path(clinic_id)}")
+
+    print(f"Split {len(clinic_ids)} clinic(s) into {SHARD_DIR}")
+
+
+if __name__ == "__main__":
+    try:
+        split()
+    except Exception as e:
+        print(f"Error while splitting database: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import heapq
+import json
+import os
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+from database import open_session
+
+STREAM_BATCH_SIZE = int(os.getenv("SERKOR_STREAM_BATCH_SIZE", "500"))
+_MEDIA_TYPES = {"json": "application/json", "ndjson": "application/x-ndjson"}
+
+
+def entity_serializer(response_model) -> Callable[[Any], bytes]:
+    return lambda entity: response_model.model_validate(entity).model_dump_json(by_alias=True).encode()
+
+
+def row_serializer(names: List[str]) -> Callable[[Any], bytes]:
+    return lambda row: json.dumps(jsonable_encoder({name: row[name] for name in names})).encode()
+
+
+def _encode(items: Iterable[bytes], fmt: str) -> Iterator[bytes]:
+    """Group serialized items into chunks of ``STREAM_BATCH_SIZE`` as a JSON array or NDJSON."""
+    chunk: List[bytes] = []
+    first = True
+    if fmt == "json":
+        yield b"["
+    for item in items:
+        if fmt == "ndjson":
+            chunk.append(item + b"\n")
+        else:
+            chunk.append(item if first else b"," + item)
+            first = False
+        if len(chunk) >= STREAM_BATCH_SIZE:
+            yield b"".join(chunk)
+            chunk = []
+    if chunk:
+        yield b"".join(chunk)
+    if fmt == "json":
+        yield b"]"
+
+
+def _rows(db: Session, stmt: Select, entities: bool) -> Iterator[Any]:
+    # yield_per fetches STREAM_BATCH_SIZE rows at a time; the session only keeps weak
+    # references to loaded entities, so serialized ones are freed as we go.
+    result = db.execute(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+    return iter(result.scalars() if entities else result.mappings())
+
+
+def stream(
+    clinic_id: Optional[str],
+    statements: List[Select],
+    serialize: Callable[[Any], bytes],
+    fmt: str,
+    entities: bool = True,
+    merge_key: Optional[Callable[[Any], Any]] = None,
+) -> StreamingResponse:
+    """Stream the results of ``statements`` with a server-side cursor, one batch at a time.
+
+    The response outlives the request's ``get_db`` session, so the generator opens and
+    closes its own on ``clinic_id``, the shard key ``get_db`` resolved for the request.
+    Several statements that are each sorted newest first can be merged by passing
+    ``merge_key``; otherwise they are streamed one after another.
+    """
+
+    def generate() -> Iterator[bytes]:
+        db = open_session(clinic_id)
+        try:
+            sources = [_rows(db, stmt, entities) for stmt in statements]
+            if merge_key is not None and len(sources) > 1:
+                items = heapq.merge(*sources, key=merge_key, reverse=True)
+            else:
+                items = (row for source in sources for row in source)
+            yield from _encode((serialize(item) for item in items), fmt)
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type=_MEDIA_TYPES[fmt])